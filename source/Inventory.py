@@ -98,15 +98,42 @@ def plotHist(histogram, order_arrivals, ss_policy):
 #******************************************************************************
 # INVENTORY CLASS
 #******************************************************************************
+def pipelineSlots(lead_time):
+    """
+    Slots of the ring buffer of scheduled arrivals: periods between an order
+    and its arrival, at least one, since an order placed at the end of a
+    period arrives the next period at the earliest.
+    """
+    return max(1, int(lead_time))
+
+
 __author__ = 'CalebAndrade'
 class Inventory(object):
     """
     A class to model an inventory control problem with (s, S) policy.
     """
+    ## fixed layout of the state, keeps instances small and clones cheap
+    __slots__ = ('level', 'initial_level', 'in_stock', 'backlog', 'place_order',
+                 'current_order', 'lead_time', 'order_delay', 'ongoing_order',
+                 'low', 'top', 'item_cost', 'backlog_cost', 'hold_cost',
+                 'setup_cost', 'streaming', 'periods', 'cost_sum', 'cost_mean',
+                 'cost_m2', 'backlog_sum', 'stockouts', 'histogram',
+                 'order_arrivals', 'backlog_hist', 'cost_hist', 'shared',
+                 'pipeline', 'head')
+    
     def __init__(self, level, item_cost, backlog_cost, hold_cost, setup_cost,
-                 lead_time, policy):
+                 lead_time, policy, streaming = False, pipeline = False):
         """
-        Initialize inventory state variables.
+        Initialize inventory state variables. In streaming mode no per-period
+        histograms are recorded, only running aggregates, so memory does not
+        grow with the number of periods simulated.
+        
+        By default at most one order is outstanding, and a new order waits
+        for the previous one to arrive. In pipeline mode any number of orders
+        may be outstanding: orders are placed when the inventory position
+        (level plus items on order) falls below s, and scheduled arrivals are
+        kept in a ring buffer with one slot per period of lead time, so a
+        period costs the same whatever the number of orders in transit.
         """
         self.level = level
         self.initial_level = level ## records the initial level, never mutates
@@ -117,16 +144,18 @@ class Inventory(object):
         self.lead_time = lead_time
         self.order_delay = 0 ## periods after an order was placed
         self.ongoing_order = False ## is there an order going on?
+        self.pipeline = None ## scheduled arrivals, pipeline mode only
+        self.head = 0 ## slot of the arrivals of the next period
+        if pipeline:
+            self.pipeline = [0]*pipelineSlots(lead_time)
         self.low = policy[0]
         self.top = policy[1]
         self.item_cost = item_cost
         self.backlog_cost = backlog_cost
         self.hold_cost = hold_cost
         self.setup_cost = setup_cost
-        self.histogram = [level] ## inventory's level histogram
-        self.order_arrivals = [self.place_order] ## records the orders arrivals
-        self.backlog_hist = [self.backlog]
-        self.cost_hist = [self.onePeriodCost()] ## inventory's cost histogram
+        self.streaming = streaming
+        self.resetHistograms()
         
                 
     def __str__(self):
@@ -138,8 +167,12 @@ class Inventory(object):
         info += 'Backlogged items........... ' + str(self.backlog) + '\n'
         info += 'Place order................ ' + str(self.place_order) + '\n'
         info += 'Current order.............. ' + str(self.current_order) + '\n'
+        info += 'Inventory position......... ' + str(self.inventoryPosition()) + '\n'
         info += 'Lead time.................. ' + str(self.lead_time) + '\n'
-        info += 'Lead time passed........... ' + str(self.order_delay) + '\n'
+        if self.pipeline is None:
+            info += 'Lead time passed........... ' + str(self.order_delay) + '\n'
+        else:
+            info += 'Orders in transit.......... ' + str(self.ordersInTransit()) + '\n'
         info += 'Policy (s, S).............. (' + str(self.low) + ', ' + str(self.top) + ')\n'
         info += 'Cost per item.............. $ ' + str(self.item_cost) + '\n'
         info += 'Backlog cost per item...... $ ' + str(self.backlog_cost) + '\n'
@@ -153,28 +186,72 @@ class Inventory(object):
     
     def clone(self):
         """
-        Returns an exact clone of self.
+        Returns an exact clone of self. Scalar state is copied, histograms
+        are shared until self or the clone records a new period, when the
+        one that writes takes its own copy (copy-on-write).
         """
-        ## initialize inventory object
-        clone = Inventory(self.level, self.item_cost, self.backlog_cost,
-                          self.hold_cost, self.setup_cost, self.lead_time,
-                          self.getPolicy())
-        ## clone values from mutable variables in self
+        ## bypass __init__, copy scalar state and share histograms
+        clone = Inventory.__new__(Inventory)
+        clone.level = self.level
         clone.initial_level = self.initial_level
         clone.in_stock = self.in_stock
         clone.backlog = self.backlog
         clone.place_order = self.place_order
         clone.current_order = self.current_order
+        clone.lead_time = self.lead_time
         clone.order_delay = self.order_delay
         clone.ongoing_order = self.ongoing_order
-        clone.histogram = self.getLevelHistogram()
-        clone.order_arrivals = self.getOrderArrivals()
-        clone.backlog_hist = self.getBacklogHistogram()
-        clone.cost_hist = self.getCostHistogram()
+        ## the ring buffer is small and written every period, always copied
+        clone.pipeline = None if self.pipeline is None else list(self.pipeline)
+        clone.head = self.head
+        clone.low = self.low
+        clone.top = self.top
+        clone.item_cost = self.item_cost
+        clone.backlog_cost = self.backlog_cost
+        clone.hold_cost = self.hold_cost
+        clone.setup_cost = self.setup_cost
+        clone.streaming = self.streaming
+        clone.periods = self.periods
+        clone.cost_sum = self.cost_sum
+        clone.cost_mean = self.cost_mean
+        clone.cost_m2 = self.cost_m2
+        clone.backlog_sum = self.backlog_sum
+        clone.stockouts = self.stockouts
+        clone.histogram = self.histogram
+        clone.order_arrivals = self.order_arrivals
+        clone.backlog_hist = self.backlog_hist
+        clone.cost_hist = self.cost_hist
+        self.shared = clone.shared = True
         
         return clone
         
         
+    def __getstate__(self):
+        """
+        State as a dictionary, for pickling.
+        """
+        return dict((name, getattr(self, name)) for name in Inventory.__slots__)
+        
+        
+    def __setstate__(self, state):
+        """
+        Restores the state from a dictionary, for unpickling.
+        """
+        for name in Inventory.__slots__:
+            setattr(self, name, state[name])
+        
+        
+    def unshareHistograms(self):
+        """
+        Takes private copies of histograms shared with a clone.
+        """
+        self.histogram = list(self.histogram)
+        self.order_arrivals = list(self.order_arrivals)
+        self.backlog_hist = list(self.backlog_hist)
+        self.cost_hist = list(self.cost_hist)
+        self.shared = False
+        
+        
     def onePeriodCost(self):
         """
         Returns the one-period cost.
@@ -205,17 +282,27 @@ class Inventory(object):
         Updates state after one period of simulation. 
         @co-author: Tsz Ching Ng.
         """
+        # histograms shared with a clone are copied before writing
+        if self.shared:
+            self.unshareHistograms()
+        
+        if self.pipeline is not None:
+            self.pipelineSim(demand)
+            return
+        
         # update inventory level, in-stock and backlog
         self.place_order = 0
         self.level -= demand
         self.backlog = max(0, -self.level)
-        self.backlog_hist.append(self.backlog)
-        self.order_arrivals.append(0) # order has not yet arrived
+        if not self.streaming:
+            self.backlog_hist.append(self.backlog)
+            self.order_arrivals.append(0) # order has not yet arrived
                     
         # has order arrived? reset order's variables
         if self.order_delay >= self.lead_time:
             self.level += self.current_order
-            self.order_arrivals[-1] = self.current_order # order arrives
+            if not self.streaming:
+                self.order_arrivals[-1] = self.current_order # order arrives
             self.current_order = 0
             self.order_delay = 0
             self.ongoing_order = False
@@ -229,15 +316,79 @@ class Inventory(object):
         # update in-stock items
         self.in_stock = max(0, self.level)
         
-        # record inventory level
-        self.histogram.append(self.level)
-        
         # update order delay time
         if self.ongoing_order:
             self.order_delay += 1
-                    
-        # update cost histogram
-        self.cost_hist.append(self.onePeriodCost())
+        
+        # record inventory level, backlog and cost
+        self.recordPeriod()
+        
+        
+    def pipelineSim(self, demand):
+        """
+        Updates state after one period of simulation in pipeline mode. The
+        order placed in a period arrives 'lead time' periods later (one
+        period later for lead time 0, as in onePeriodSim), in the slot of
+        the ring buffer that the period has just emptied.
+        """
+        # update inventory level, in-stock and backlog
+        self.place_order = 0
+        self.level -= demand
+        self.backlog = max(0, -self.level)
+        if not self.streaming:
+            self.backlog_hist.append(self.backlog)
+        
+        # receive the items scheduled for this period
+        arrival = self.pipeline[self.head]
+        self.level += arrival
+        self.current_order -= arrival
+        if not self.streaming:
+            self.order_arrivals.append(arrival)
+        
+        # place an order? items on order count towards the position
+        position = self.level + self.current_order
+        if position < self.low:
+            self.place_order = self.top - position
+            self.current_order += self.place_order
+        self.pipeline[self.head] = self.place_order
+        self.head = (self.head + 1) % len(self.pipeline)
+        self.ongoing_order = self.current_order != 0
+        
+        # update in-stock items
+        self.in_stock = max(0, self.level)
+        
+        # record inventory level, backlog and cost
+        self.recordPeriod()
+        
+        
+    def recordPeriod(self):
+        """
+        Records the level, backlog and cost of the period just simulated.
+        """
+        self.periods += 1
+        self.recordCost(self.onePeriodCost())
+        if self.streaming:
+            self.backlog_sum += self.backlog
+            if self.backlog > 0:
+                self.stockouts += 1
+        else:
+            self.histogram.append(self.level)
+        
+        
+    def inventoryPosition(self):
+        """
+        Returns the inventory position: level plus items on order.
+        """
+        return self.level + self.current_order
+        
+        
+    def ordersInTransit(self):
+        """
+        Returns the number of outstanding orders.
+        """
+        if self.pipeline is None:
+            return int(self.ongoing_order)
+        return len([q for q in self.pipeline if q != 0])
         
         
     def simulation(self, demands):
@@ -249,11 +400,61 @@ class Inventory(object):
             self.onePeriodSim(demand)
                         
     
+    def recordCost(self, cost):
+        """
+        Adds the cost of the current period to the running aggregates, and
+        to the histograms if not streaming.
+        """
+        self.cost_sum += cost
+        if self.streaming:
+            ## Welford's update of the mean and sum of squared deviations
+            delta = cost - self.cost_mean
+            self.cost_mean += delta / float(self.periods + 1)
+            self.cost_m2 += delta*(cost - self.cost_mean)
+        else:
+            self.cost_hist.append(cost)
+            
+    
     def averageCost(self):
         """
-        Returns the average of costs recorded in 'self.hist_cost'.
+        Returns the average of costs recorded, same as the average of
+        'self.cost_hist' but in constant time.
+        """
+        return float(self.cost_sum) / (self.periods + 1)
+        
+        
+    def costVariance(self):
+        """
+        Returns the sample variance of the costs recorded, 0.0 before any
+        period is simulated.
         """
-        return float(sum(self.cost_hist)) / len(self.cost_hist)
+        if self.periods == 0:
+            return 0.0
+        if not self.streaming:
+            mean = self.averageCost()
+            return sum([(cost - mean)**2 for cost in self.cost_hist]) / self.periods
+        return self.cost_m2 / self.periods
+        
+        
+    def averageBacklog(self):
+        """
+        Returns the average number of backlogged items per period, 0.0
+        before any period is simulated.
+        """
+        if self.periods == 0:
+            return 0.0
+        if not self.streaming:
+            return float(sum(self.backlog_hist[1:])) / self.periods
+        return float(self.backlog_sum) / self.periods
+        
+        
+    def getStockouts(self):
+        """
+        Gets number of periods that ended with backlogged items.
+        """
+        if not self.streaming:
+            return len([b for b in self.backlog_hist[1:] if b > 0])
+        return self.stockouts
             
         
     def reset(self):
@@ -268,16 +469,41 @@ class Inventory(object):
         self.current_order = 0
         self.order_delay = 0 
         self.ongoing_order = False 
-        self.histogram = [self.level] 
-        self.cost_hist = [self.onePeriodCost()]  
-        self.order_arrivals = [self.place_order] ## records the orders arrivals
-        self.backlog_hist = [self.place_order]
+        if self.pipeline is not None:
+            self.pipeline = [0]*len(self.pipeline)
+            self.head = 0
+        self.resetHistograms()
+        
+        
+    def resetHistograms(self):
+        """
+        Starts histograms and running aggregates from the current state.
+        """
+        self.periods = 0 ## number of periods of simulation
+        self.cost_sum = 0 ## running sum of the costs recorded
+        self.cost_mean = 0.0 ## running mean of the costs, streaming only
+        self.cost_m2 = 0.0 ## sum of squared deviations, streaming only
+        self.backlog_sum = 0 ## backlogged items, streaming only
+        self.stockouts = 0 ## periods with backlogged items, streaming only
+        self.histogram = [] ## inventory's level histogram
+        self.order_arrivals = [] ## records the orders arrivals
+        self.backlog_hist = []
+        self.cost_hist = [] ## inventory's cost histogram
+        self.shared = False ## are histograms shared with a clone?
+        if not self.streaming:
+            self.histogram.append(self.level)
+            self.order_arrivals.append(self.place_order)
+            self.backlog_hist.append(self.backlog)
+        self.recordCost(self.onePeriodCost())
         
     
     def plot(self):
         """
         Plots level histogram.
         """
+        if self.streaming:
+            print "Warning: no histogram is recorded in streaming mode!"
+            return
         plotHist(self.histogram, self.order_arrivals, [self.low, self.top])
         
         
@@ -306,7 +532,7 @@ class Inventory(object):
         """
         Gets number of periods of simulation.
         """
-        return len(self.histogram) - 1
+        return self.periods
         
     
     def getPolicy(self):
@@ -349,6 +575,55 @@ def readFile(filetxt):
 #******************************************************************************
 # EXAMPLES
 #******************************************************************************
+def cloneBenchmark(periods = 365, repeats = 20000):
+    """
+    Microbenchmark of clone(). Times the clone of an inventory that carries
+    'periods' periods of history against a full copy that goes through
+    __init__ and duplicates every histogram, as clone() used to do.
+    """
+    import random
+    import time
+    
+    def fullCopy(inventory):
+        clone = Inventory(inventory.level, inventory.item_cost,
+                          inventory.backlog_cost, inventory.hold_cost,
+                          inventory.setup_cost, inventory.lead_time,
+                          inventory.getPolicy())
+        clone.initial_level = inventory.initial_level
+        clone.in_stock = inventory.in_stock
+        clone.backlog = inventory.backlog
+        clone.place_order = inventory.place_order
+        clone.current_order = inventory.current_order
+        clone.order_delay = inventory.order_delay
+        clone.ongoing_order = inventory.ongoing_order
+        clone.histogram = inventory.getLevelHistogram()
+        clone.order_arrivals = inventory.getOrderArrivals()
+        clone.backlog_hist = inventory.getBacklogHistogram()
+        clone.cost_hist = inventory.getCostHistogram()
+        return clone
+    
+    inventory = Inventory(50, 3, 5, 1, 32, 0, (50, 100))
+    inventory.simulation([random.expovariate(0.12) for i in range(periods)])
+    
+    tic = time.time()
+    for rep in range(repeats):
+        fullCopy(inventory)
+    toc = time.time()
+    before = (toc - tic) / repeats
+    
+    tic = time.time()
+    for rep in range(repeats):
+        inventory.clone()
+    toc = time.time()
+    after = (toc - tic) / repeats
+    
+    print "\nClone of an inventory with", periods, "periods of history"
+    print "Full copy through __init__... ", 1e6*before, "us"
+    print "Copy-on-write clone.......... ", 1e6*after, "us"
+    
+    return before, after
+    
+    
 def main():
     """
     Testing examples.
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 14:55:31 2026
+
+@author: Caleb Andrade
+
+Simulated Annealing (with or without Ranking and Selection) run as several
+independent Markov chains in parallel processes, which periodically
+exchange the best policy found so far.
+"""
+from Inventory import Inventory
+from math import exp
+from sampleMean import sampleMean1, SEED_SOURCE
+from seed_streams import SeedSource
+import multiprocessing
+import random
+import time
+
+
+def nextPolicy(policy, prng):
+    """
+    Generate a random neighboring policy, within an offset of +/- 5 units.
+
+    Input: policy, random number generator of the chain.
+    Output: neighboring policy.
+    """
+    low = policy[0] + prng.randint(-5, 5)
+    top = policy[1] + prng.randint(-5, 5)
+    if low > top:
+        return top, low
+    return low, top
+
+
+def initChain(inventory_a, temperature, index, param, rank, policy, seed):
+    """
+    Initial state of a chain, a dictionary with the current system, its
+    sample mean and seeds, best values found (the best mean with the seeds
+    it was measured on), temperature and counters.
+
+    Input: inventory, initial temperature, inventory's index, parameters for
+    randomly generated demands, ranking and selection?, starting policy
+    (None keeps the inventory's), seed of the chain's random numbers, which
+    is also the root of the chain's demand seeds.
+    Output: chain state.
+    """
+    system_a = inventory_a.clone()
+    if policy is not None:
+        system_a.setPolicy(policy)
+    chain = {'system': system_a, 'best_policy': system_a.getPolicy(),
+             'temperature': temperature, 'k': 0, 'count': 0,
+             'histogram': [], 'prng': random.Random(seed).getstate(),
+             'seed_source': SeedSource(seed).getState()}
+
+    ## demand seeds of the chain come from its own source
+    saved = SEED_SOURCE.getState()
+    SEED_SOURCE.setState(chain['seed_source'])
+    chain['mean'], chain['seeds'] = sampleMean1(system_a, param, 1, 0.9, index,
+                                                rank, [])
+    chain['best_mean'] = chain['mean']
+    chain['best_seeds'] = chain['seeds']
+    chain['seed_source'] = SEED_SOURCE.getState()
+    SEED_SOURCE.setState(saved)
+
+    return chain
+
+
+def runChain(args):
+    """
+    Advance a chain by at most 'steps' iterations of simulated annealing,
+    following exactly the loop of simAnnealing1.
+
+    Input: tuple (chain state, steps, mkv_long, cooling_factor, repeats,
+    index, param, rank).
+    Output: updated chain state.
+    """
+    chain, steps, mkv_long, cooling_factor, repeats, index, param, rank = args
+    prng = random.Random()
+    prng.setstate(chain['prng'])
+    SEED_SOURCE.setState(chain['seed_source'])
+    system_a = chain['system']
+
+    for step in range(steps):
+        ## stopping condition, checked when a markov chain is completed
+        if chain['count'] == 0 and chain['k'] >= repeats:
+            break
+        ## propose next policy, create new inventory with it
+        next_policy = nextPolicy(system_a.getPolicy(), prng)
+        next_system_a = system_a.clone()
+        next_system_a.setPolicy(next_policy)
+
+        ## compute sample mean of next inventory
+        next_mean, next_seeds = sampleMean1(next_system_a, param, 1, 0.9,
+                                            index, rank, chain['seeds'])
+        # determine if next policy is accepted
+        accept = False
+        if next_mean <= chain['mean']:
+            accept = True
+            if next_mean <= chain['best_mean']:
+                chain['best_mean'] = next_mean
+                chain['best_policy'] = next_policy
+                chain['best_seeds'] = next_seeds
+        else:
+            prob = 1 / exp((next_mean - chain['mean']) / chain['temperature'])
+            if prng.random() <= prob:
+                accept = True
+
+        if accept:
+            ## set new policy and record cost value
+            system_a.setPolicy(next_policy)
+            system_a.reset()
+            chain['histogram'].append(next_mean)
+            chain['mean'] = next_mean
+            chain['seeds'] = next_seeds
+        chain['k'] += 1 # update iteration
+        chain['count'] += 1 # update markov chain length
+        if chain['count'] == mkv_long:
+            chain['count'] = 0
+            chain['temperature'] = cooling_factor*chain['temperature']
+
+    chain['prng'] = prng.getstate()
+    chain['seed_source'] = SEED_SOURCE.getState()
+    return chain
+
+
+def multiChainAnnealing(inventory_a, temperature, mkv_long, cooling_factor,
+                        repeats, index, param, chains = 4, sync = 50,
+                        rank = True, policies = None, seed = None):
+    """
+    Parallel Simulated Annealing with several Markov chains. Each chain runs
+    simAnnealing1 in its own process with its own random numbers; every
+    'sync' iterations the chains whose current cost is worse than the global
+    best restart from the global best policy, with its mean and the seeds
+    that mean was measured on.
+
+    Input: inventory, temperature, markov chain length, cooling factor,
+    iterations per chain, inventory's index, parameters for randomly
+    generated demands, number of chains, iterations between exchanges,
+    ranking and selection?, list of starting policies (one per chain), seed
+    to make the chains' random numbers reproducible.
+    Output: best mean, best policy, list of histograms, one per chain.
+    """
+    if policies is None:
+        policies = [None]*chains
+    if len(policies) != chains:
+        raise ValueError("%d starting policies given for %d chains"
+                         % (len(policies), chains))
+    if seed is None:
+        seed = random.randrange(2**32)
+
+    states = [initChain(inventory_a, temperature, index, param, rank,
+                        policies[i], seed + i) for i in range(chains)]
+    pool = multiprocessing.Pool(chains)
+
+    while any(chain['count'] != 0 or chain['k'] < repeats for chain in states):
+        tasks = [(chain, sync, mkv_long, cooling_factor, repeats, index, param,
+                  rank) for chain in states]
+        states = pool.map(runChain, tasks)
+
+        ## exchange the global best state among chains
+        best = min(states, key = lambda chain: chain['best_mean'])
+        for chain in states:
+            if chain['mean'] > best['best_mean']:
+                chain['system'].setPolicy(best['best_policy'])
+                chain['system'].reset()
+                chain['mean'] = best['best_mean']
+                chain['seeds'] = list(best['best_seeds'])
+
+    pool.close()
+    pool.join()
+    best = min(states, key = lambda chain: chain['best_mean'])
+
+    return (best['best_mean'], best['best_policy'],
+            [chain['histogram'] for chain in states])
+
+
+"""
+PARALLEL SARS SIMULATION FOR AN INDEPENDENT INVENTORY
+"""
+def main(repeats):
+    """
+    Testing.
+    """
+    param = (120, 0.12, 0.10, -0.8)
+    inventory_a = Inventory(50, 3, 5, 1, 32, 0, (50, 100))
+
+    tic = time.time()
+    result = multiChainAnnealing(inventory_a, 10, 50, 0.5, repeats, 0, param,
+                                 4, 25, True, [(50, 100), (10, 40), (20, 60), (30, 80)])
+    toc = time.time()
+
+    print "\nPARALLEL SARS WITH RANKING AND SELECTION, INDEPENDENT INVENTORY"
+    print "\nInventory_a, best objective function cost: ", result[0]
+    print "Best policy: ", result[1]
+    print "Running time: ", toc-tic
+    print "Accepted moves per chain: ", [len(hist) for hist in result[2]]
+
+# uncomment next line to run simulation.
+#main(100)
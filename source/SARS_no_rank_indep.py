@@ -8,6 +8,7 @@ Created on Sat Nov 21 15:12:36 2015
 from Inventory import Inventory
 from math import exp
 from sampleMean import sampleMean1
+from checkpoint import saveCheckpoint, loadCheckpoint, rngStates, setRngStates
 import random
 import time
 from gencorrdemand import genCorrDemand as gcd
@@ -28,24 +29,58 @@ def nextPolicy(policy):
     return low, top 
     
 
-def simAnnealing1(inventory_a, temperature, mkv_long, cooling_factor, repeats, index, param):
+def metropolis(next_mean, mean, temperature):
+    """
+    Metropolis acceptance test: a policy that is not worse is accepted, a
+    worse one with probability exp(-(next_mean - mean) / temperature). As
+    the current mean is never below the best mean, only policies accepted
+    for not being worse can improve the best.
+    
+    Input: sample means of the proposed and current policies, temperature.
+    Output: is the proposed policy accepted?
+    """
+    if next_mean <= mean:
+        return True
+    prob = 1 / exp((next_mean - mean) / temperature)
+    
+    return random.random() <= prob
+    
+
+def simAnnealing1(inventory_a, temperature, mkv_long, cooling_factor, repeats, index, param,
+                  surrogate = None, checkpoint = None, state = None):
     """
     Simulated Annealing with Ranking and Selection implementation to 
     select best policy (s, S) for an inventory control system.
     
     Input: inventory,  number of iterations, temperature, inventory's index,
-    parameters for randomly generated demands.
+    parameters for randomly generated demands. As an option, surrogate is a
+    Surrogate model that pre-screens the proposals, only promising ones are
+    simulated; it holds the report of its prediction error. checkpoint is
+    a file where the full state of the run is saved after every markov
+    chain, and state a saved state to continue from (see resumeAnnealing1).
     Output: best policy.
     """
     ## initialize variables
-    histogram = []
     accept = False
-    k = 0
-    
-    ## create a copy of inventory, initialize best and current mean and seeds
-    system_a = inventory_a.clone()
-    best_mean, best_seeds = sampleMean1(system_a, param, 1, 0.9, index, False, [])  
-    mean, seeds = best_mean, best_seeds          
+    if state is None:
+        histogram = []
+        k = 0
+        
+        ## create a copy of inventory, initialize best and current mean and seeds
+        system_a = inventory_a.clone()
+        best_mean, best_seeds = sampleMean1(system_a, param, 1, 0.9, index, False, [])  
+        if surrogate is not None:
+            surrogate.update(system_a.getPolicy(), best_mean)
+        best_policy = system_a.getPolicy()
+        mean, seeds = best_mean, best_seeds          
+    else:
+        ## continue a checkpointed run where it stopped
+        system_a = state['system_a']
+        temperature, k = state['temperature'], state['k']
+        mean, seeds = state['mean'], state['seeds']
+        best_mean, best_policy = state['best_mean'], state['best_policy']
+        histogram = state['histogram']
+        setRngStates(state['rng'])
         
     ## start simulation main loop
     while k < repeats: # stopping condition!
@@ -57,18 +92,21 @@ def simAnnealing1(inventory_a, temperature, mkv_long, cooling_factor, repeats, i
             next_system_a = system_a.clone()
             next_system_a.setPolicy(next_policy)
             
+            ## proposals the surrogate deems hopeless are rejected unsimulated
+            if surrogate is not None and not surrogate.promising(next_policy, mean, temperature):
+                k += 1
+                count += 1
+                continue
+            
             ## compute sample mean of next inventory
             next_mean, next_seeds = sampleMean1(next_system_a, param, 1, 0.9, index, False, seeds)            
+            if surrogate is not None:
+                surrogate.update(next_policy, next_mean)
             # determine if next policy is accepted
-            if next_mean <= mean:
-                accept = True
-                if next_mean <= best_mean:
-                    best_mean = next_mean
-                    best_policy = next_policy
-            else:
-                prob = 1 / exp((next_mean - mean) / temperature)
-                if random.random() <= prob:
-                    accept = True
+            accept = metropolis(next_mean, mean, temperature)
+            if accept and next_mean <= best_mean:
+                best_mean = next_mean
+                best_policy = next_policy
             
             if accept:
                 print "Iteration: ", k
@@ -82,10 +120,34 @@ def simAnnealing1(inventory_a, temperature, mkv_long, cooling_factor, repeats, i
             count += 1 # update markov chain length
             accept = False
         temperature = cooling_factor*temperature # update temperature
+        if checkpoint is not None:
+            saveCheckpoint(checkpoint, {'args': (mkv_long, cooling_factor, repeats, index, param),
+                                        'system_a': system_a, 'temperature': temperature,
+                                        'k': k, 'mean': mean, 'seeds': seeds,
+                                        'best_mean': best_mean, 'best_policy': best_policy,
+                                        'histogram': histogram, 'surrogate': surrogate,
+                                        'rng': rngStates()})
     
     return best_mean, best_policy, histogram
         
 
+def resumeAnnealing1(checkpoint):
+    """
+    Resume a run of simAnnealing1 from its checkpoint file. The run goes on
+    exactly as if it had not been interrupted, and keeps saving its state
+    in the same file.
+    
+    Input: checkpoint file.
+    Output: best policy, as simAnnealing1.
+    """
+    state = loadCheckpoint(checkpoint)
+    mkv_long, cooling_factor, repeats, index, param = state['args']
+    
+    return simAnnealing1(state['system_a'], state['temperature'], mkv_long,
+                         cooling_factor, repeats, index, param,
+                         state['surrogate'], checkpoint, state)
+    
+
 """
 SARS SIMULATION FOR TWO INDEPENDENT INVENTORIES WITH NEGATIVE CORRELATED DEMANDS
 """
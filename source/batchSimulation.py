@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 09:12:40 2026
+
+@author: Caleb Andrade
+
+Vectorized simulation engine: advances many replications of an (s, S)
+inventory at once, one period at a time, holding the state of every
+replication in NumPy arrays instead of one Inventory object per run.
+"""
+import numpy as np
+
+from jit_kernel import COMPILED, kernelSimulation
+
+
+#******************************************************************************
+# SIMULATION KERNEL
+#******************************************************************************
+
+def batchKernel(demands, level, item_cost, backlog_cost, hold_cost,
+                setup_cost, lead_time, low, top, pipeline = False):
+    """
+    Advance every system in the batch through all periods of 'demands' and
+    return the average cost of each system. The update rules are exactly
+    those of Inventory.onePeriodSim and Inventory.onePeriodCost.
+
+    Input: array of demands whose last axis is the time period, initial
+    level, costs, lead time and policy (s, S). Every argument other than
+    'demands' may be a scalar or an array that broadcasts against
+    demands[..., 0], so one call can cover replications, policies or SKUs.
+    With 'pipeline' the systems follow Inventory.pipelineSim instead.
+    Output: array of average costs, one per system in the batch.
+    """
+    if pipeline:
+        return pipelineKernel(demands, level, item_cost, backlog_cost,
+                              hold_cost, setup_cost, lead_time, low, top)
+    demands = np.asarray(demands, dtype=np.float64)
+    shape = np.broadcast(demands[..., 0], level, item_cost, backlog_cost,
+                         hold_cost, setup_cost, lead_time, low, top).shape
+
+    ## state variables, one entry per system
+    level = np.zeros(shape) + level
+    current = np.zeros(shape) ## number of items to arrive
+    delay = np.zeros(shape) ## periods after an order was placed
+    ongoing = np.zeros(shape, dtype=bool) ## is there an order going on?
+
+    ## cost of the initial state, as recorded by Inventory.__init__
+    total = np.maximum(0, level)*hold_cost + np.maximum(0, -level)*backlog_cost
+
+    for period in range(demands.shape[-1]):
+        ## update inventory level and backlog
+        level = level - demands[..., period]
+        backlog = np.maximum(0, -level)
+
+        ## has order arrived? reset order's variables
+        arrive = delay >= lead_time
+        level = np.where(arrive, level + current, level)
+        current = np.where(arrive, 0, current)
+        delay = np.where(arrive, 0, delay)
+        ongoing = ongoing & ~arrive
+
+        ## place an order?
+        new_order = (level < low) & ~ongoing
+        order = np.where(new_order, top - level, 0)
+        current = np.where(new_order, order, current)
+        ongoing = ongoing | new_order
+
+        ## update order delay time
+        delay = delay + ongoing
+
+        ## one period cost, setup and item costs only the day an order is placed
+        cost = np.maximum(0, level)*hold_cost + backlog*backlog_cost
+        cost = np.where(order != 0, cost + (setup_cost + item_cost*order), cost)
+        total = total + cost
+
+    return total / (demands.shape[-1] + 1)
+
+
+def pipelineKernel(demands, level, item_cost, backlog_cost, hold_cost,
+                   setup_cost, lead_time, low, top):
+    """
+    Pipeline mode of batchKernel, with the update rules of
+    Inventory.pipelineSim: many outstanding orders, ordering on the
+    inventory position. Scheduled arrivals are held in a ring buffer with
+    one row per period of the longest lead time in the batch; every period
+    reads one row and writes each new order once, whatever the number of
+    orders in transit.
+
+    Input: same as batchKernel.
+    Output: array of average costs, one per system in the batch.
+    """
+    demands = np.asarray(demands, dtype=np.float64)
+    shape = np.broadcast(demands[..., 0], level, item_cost, backlog_cost,
+                         hold_cost, setup_cost, lead_time, low, top).shape
+
+    ## periods from an order to its arrival, at least one (see pipelineSlots)
+    lag = np.maximum(1, np.zeros(shape, dtype=int) + np.asarray(lead_time, dtype=int))
+    slots = int(lag.max()) if lag.size else 1
+
+    ## state variables, one entry per system, and the flat ring buffer
+    level = np.zeros(shape) + level
+    current = np.zeros(shape) ## number of items on order
+    ring = np.zeros((slots, lag.size)) ## scheduled arrivals, by period mod slots
+    systems = np.arange(lag.size)
+    lag = lag.ravel()
+
+    ## cost of the initial state, as recorded by Inventory.__init__
+    total = np.maximum(0, level)*hold_cost + np.maximum(0, -level)*backlog_cost
+
+    for period in range(demands.shape[-1]):
+        ## update inventory level and backlog
+        level = level - demands[..., period]
+        backlog = np.maximum(0, -level)
+
+        ## receive the items scheduled for this period
+        head = period % slots
+        arrival = ring[head].reshape(shape)
+        level = level + arrival
+        current = current - arrival
+        ring[head] = 0
+
+        ## place an order? items on order count towards the position
+        position = level + current
+        order = np.where(position < low, top - position, 0)
+        current = current + order
+        ring[(period + lag) % slots, systems] = order.ravel()
+
+        ## one period cost, setup and item costs only the day an order is placed
+        cost = np.maximum(0, level)*hold_cost + backlog*backlog_cost
+        cost = np.where(order != 0, cost + (setup_cost + item_cost*order), cost)
+        total = total + cost
+
+    return total / (demands.shape[-1] + 1)
+
+
+#******************************************************************************
+# BATCH SIMULATION
+#******************************************************************************
+
+def batchSimulation(inventory, demands):
+    """
+    Simulate all replications of an inventory at once. Every replication
+    starts from the inventory's initial state, as after Inventory.reset().
+
+    Input: inventory, (replications x periods) matrix of demands.
+    Output: array with the average cost of every replication, equal to
+    what Inventory.averageCost() returns after simulating each row.
+    """
+    return batchKernel(demands, inventory.initial_level, inventory.item_cost,
+                       inventory.backlog_cost, inventory.hold_cost,
+                       inventory.setup_cost, inventory.lead_time,
+                       inventory.low, inventory.top,
+                       inventory.pipeline is not None)
+
+
+def batchRepSimulation(inventory, demands_list, repeats, index):
+    """
+    Batched counterpart of repSimulation, run by the compiled kernel of
+    jit_kernel when Numba is installed.
+
+    Input: inventory, list of demands, repeats, index of inventory.
+    Output: a list with average costs of every run.
+    """
+    if repeats == 0:
+        return []
+    demands = np.array([demands_list[rep][index] for rep in range(repeats)])
+    if COMPILED:
+        return kernelSimulation(inventory, demands).tolist()
+
+    return batchSimulation(inventory, demands).tolist()
+
+
+#******************************************************************************
+# POLICY GRID EVALUATION
+#******************************************************************************
+
+def policyGrid(low_range, top_range):
+    """
+    Build every feasible policy (s, S), s < S, from two ranges of values.
+
+    Input: candidate values for s, candidate values for S.
+    Output: (policies x 2) array of policies.
+    """
+    low, top = np.meshgrid(low_range, top_range, indexing='ij')
+    feasible = low < top
+
+    return np.column_stack((low[feasible], top[feasible]))
+
+
+def policyGridSimulation(inventory, policies, demands, chunk = 1000):
+    """
+    Simulate many (s, S) policies of an inventory against a common matrix of
+    demands. Every policy sees the same demands (common random numbers).
+
+    Input: inventory, sequence of policies (s, S), (replications x periods)
+    matrix of demands, maximum number of policies advanced together, which
+    bounds memory to chunk*replications values per state variable.
+    Output: (policies x replications) matrix of average costs.
+    """
+    policies = np.asarray(policies, dtype=np.float64).reshape(-1, 2)
+    demands = np.asarray(demands, dtype=np.float64)
+    costs = np.empty((len(policies), demands.shape[0]))
+
+    for start in range(0, len(policies), chunk):
+        block = policies[start:start + chunk]
+        costs[start:start + chunk] = batchKernel(demands,
+                       inventory.initial_level, inventory.item_cost,
+                       inventory.backlog_cost, inventory.hold_cost,
+                       inventory.setup_cost, inventory.lead_time,
+                       block[:, 0:1], block[:, 1:2],
+                       inventory.pipeline is not None)
+
+    return costs
+
+
+#******************************************************************************
+# PORTFOLIO SIMULATION
+#******************************************************************************
+
+def portfolioSimulation(inventories, demands):
+    """
+    Simulate a portfolio of N inventories, one per product, in a single
+    pass: every period advances the N inventories of every replication
+    together, each with its own costs, lead time and policy.
+
+    Input: list of N inventories, (N x periods) or (N x replications x
+    periods) array of demands, as genCorrDemandN returns, row i being the
+    demands of inventories[i]. Inventories in pipeline mode and the others
+    are simulated in two groups.
+    Output: per product average costs, of shape (N,) or (N x replications),
+    and joint average cost, their sum over products.
+    """
+    demands = np.asarray(demands, dtype=np.float64)
+    ## parameters as columns that broadcast against demands[..., 0]
+    shape = (len(inventories),) + (1,)*(demands.ndim - 2)
+
+    def column(name):
+        return np.array([getattr(inventory, name) for inventory in inventories],
+                        dtype=np.float64).reshape(shape)
+
+    params = [column(name) for name in ('initial_level', 'item_cost',
+              'backlog_cost', 'hold_cost', 'setup_cost', 'lead_time', 'low', 'top')]
+    pipeline = np.array([inventory.pipeline is not None for inventory in inventories])
+    costs = np.empty(demands.shape[:-1])
+    for mode in (False, True):
+        group = pipeline == mode
+        if group.any():
+            costs[group] = batchKernel(demands[group],
+                                       *[param[group] for param in params],
+                                       pipeline = mode)
+
+    return costs, costs.sum(axis=0)
+
+
+#******************************************************************************
+# TESTING ZONE
+#******************************************************************************
+
+def main():
+    """
+    Testing.
+    """
+    import time
+    from Inventory import Inventory
+    from gencorrdemand import genCorrDemand as gcd
+
+    inventory = Inventory(50, 3, 5, 1, 32, 0, (50, 100))
+    param = (365, 0.12, 0.10, -0.8)
+    demands_list = [gcd(param[0], param[1], param[2], param[3]) for j in range(200)]
+
+    tic = time.clock()
+    loop = []
+    temp_inventory = inventory.clone()
+    for demands in demands_list:
+        temp_inventory.simulation(demands[0])
+        loop.append(temp_inventory.averageCost())
+        temp_inventory.reset()
+    toc = time.clock()
+    print "\nLoop running time: ", toc - tic
+
+    tic = time.clock()
+    batch = batchRepSimulation(inventory, demands_list, len(demands_list), 0)
+    toc = time.clock()
+    print "Batch running time: ", toc - tic
+    print "Identical averages: ", loop == batch
+
+    policies = policyGrid(range(0, 101, 2), range(0, 201, 2))
+    tic = time.clock()
+    costs = policyGridSimulation(inventory, policies, [d[0] for d in demands_list])
+    toc = time.clock()
+    best = costs.mean(axis=1).argmin()
+    print "\nPolicies evaluated: ", len(policies)
+    print "Best policy on grid: ", tuple(policies[best]), costs[best].mean()
+    print "Grid running time: ", toc - tic
+
+    from gencorrdemand import genCorrDemandN
+    products = 200
+    prng = np.random.RandomState(0)
+    ## random correlation matrix, from a random factor model
+    factors = prng.normal(size=(products, 5))
+    corr = np.dot(factors, factors.T) + np.diag(prng.uniform(1, 5, products))
+    corr /= np.sqrt(np.outer(np.diag(corr), np.diag(corr)))
+    lambdas = prng.uniform(0.05, 0.2, products)
+    inventories = [Inventory(50, 3, 5, 1, 32, j % 3, (20 + j % 30, 100))
+                   for j in range(products)]
+
+    tic = time.clock()
+    demands = genCorrDemandN(20, 365, lambdas, corr)
+    costs, joint = portfolioSimulation(inventories, demands)
+    toc = time.clock()
+    print "\nProducts in portfolio: ", products
+    print "Mean joint cost: ", joint.mean()
+    print "Most expensive product: ", costs.mean(axis=1).argmax()
+    print "Portfolio running time: ", toc - tic
+
+    ## two weeks of lead time: one order at a time against the pipeline
+    single = Inventory(50, 3, 5, 1, 32, 14, (50, 100))
+    pipeline = Inventory(50, 3, 5, 1, 32, 14, (50, 100), pipeline = True)
+    demands = np.array([d[0] for d in demands_list])
+    tic = time.clock()
+    costs = batchSimulation(pipeline, demands)
+    toc = time.clock()
+    pipeline.simulation(demands[0])
+    print "\nSingle order mean cost: ", batchSimulation(single, demands).mean()
+    print "Pipeline mean cost: ", costs.mean()
+    print "Pipeline matches Inventory: ", pipeline.averageCost() == costs[0]
+    print "Pipeline running time: ", toc - tic
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 22:56:10 2026
+
+@author: Caleb Andrade
+
+Reproducible benchmark suite: throughput of the inventory simulation and of
+the demand generator, latency of the sample means and speed of the
+annealing runs. Every benchmark draws its random numbers from fixed seeds
+and starts with empty caches, so two runs of the suite do the same work;
+results, together with the values computed (to catch changes of results
+as well as of speed), are written as JSON for regression tracking.
+"""
+import json
+import os
+import platform
+import random
+import sys
+import time
+from timeit import default_timer
+import numpy as np
+import scipy
+
+import sampleMean
+from Inventory import Inventory
+from batchSimulation import batchSimulation
+from gencorrdemand import genCorrDemand, genCorrDemandBlock
+
+## demands' parameters and inventories used by every benchmark
+PARAM = (365, 0.12, 0.10, -0.8)
+INVENTORY_A = (50, 3, 5, 1, 32, 0, (50, 100))
+INVENTORY_B = (50, 3, 20, 1, 5, 0, (50, 100))
+SEED = 12345
+
+
+def bestTime(fct, rounds = 3):
+    """
+    Best wall time of 'rounds' calls of fct, and its last result.
+    """
+    best = None
+    for i in range(rounds):
+        tic = default_timer()
+        result = fct()
+        toc = default_timer()
+        if best is None or toc - tic < best:
+            best = toc - tic
+
+    return best, result
+
+
+def fixedSeeds(n, seed = SEED):
+    """
+    List of n seeds, as genSeeds makes them, drawn from a fixed seed.
+    """
+    sampleMean.SEED_SOURCE.seed(seed)
+
+    return sampleMean.genSeeds(n)
+
+
+def resetState(seed = SEED, betas = (0.90,)):
+    """
+    Seed every random number generator and empty the caches. The h tables
+    of 'betas' (first stage of 20) are loaded, or built and saved if the
+    disk cache is cold, so no benchmark times them.
+    """
+    for beta in betas:
+        sampleMean.setPrecision(beta, 20)
+    random.seed(seed)
+    np.random.seed(seed)
+    sampleMean.SEED_SOURCE.seed(seed)
+    sampleMean.DEMAND_CACHE.clear()
+    sampleMean.POLICY_CACHE.clear()
+
+
+class Silence(object):
+    """
+    Context that discards what the annealing loops print.
+    """
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, 'w')
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+
+#******************************************************************************
+# BENCHMARKS
+#******************************************************************************
+
+def benchSimulation(horizons = (30, 365, 3650), repeats = 20):
+    """
+    Periods simulated per second by Inventory.simulation (onePeriodSim, one
+    period at a time) and by the batch engine, for several horizons.
+    """
+    results = []
+    for periods in horizons:
+        demands = [genCorrDemand(periods, PARAM[1], PARAM[2], PARAM[3],
+                                 seed = seed)[0] for seed in fixedSeeds(repeats)]
+
+        def serial():
+            costs = []
+            for row in demands:
+                inventory = Inventory(*INVENTORY_A)
+                inventory.simulation(row)
+                costs.append(inventory.averageCost())
+            return costs
+
+        seconds, costs = bestTime(serial)
+        batch_seconds, batch_costs = bestTime(
+            lambda: batchSimulation(Inventory(*INVENTORY_A), np.array(demands)))
+        results.append({'periods': periods, 'repeats': repeats,
+                        'seconds': seconds,
+                        'periods_per_second': periods*repeats / seconds,
+                        'batch_seconds': batch_seconds,
+                        'batch_periods_per_second': periods*repeats / batch_seconds,
+                        'mean_cost': float(np.mean(costs)),
+                        'batch_mean_cost': float(np.mean(batch_costs))})
+
+    return results
+
+
+def benchDemands(sizes = (30, 365, 3650, 36500), repeats = 50):
+    """
+    Correlated demands generated per second by genCorrDemand, one pair of
+    streams per call, and by genCorrDemandBlock, 'repeats' pairs at once.
+    """
+    results = []
+    for num in sizes:
+        seeds = fixedSeeds(repeats)
+        seconds, demands = bestTime(lambda: [genCorrDemand(num, PARAM[1], PARAM[2],
+                                             PARAM[3], seed = seed) for seed in seeds])
+        block_seconds, block = bestTime(lambda: genCorrDemandBlock(
+            repeats, num, PARAM[1], PARAM[2], PARAM[3], seeds = seeds))
+        results.append({'size': num, 'repeats': repeats, 'seconds': seconds,
+                        'demands_per_second': 2*num*repeats / seconds,
+                        'block_seconds': block_seconds,
+                        'block_demands_per_second': 2*num*repeats / block_seconds,
+                        'mean_demand': float(np.mean([row[0] for row in demands]))})
+
+    return results
+
+
+def benchSampleMean(settings = ((1, 0.90), (0.5, 0.90), (1, 0.95))):
+    """
+    Latency of sampleMean1 and sampleMean2 with ranking and selection, for
+    several (delta, beta), starting with empty caches.
+    """
+    results = []
+    for delta, beta in settings:
+        for name in ('sampleMean1', 'sampleMean2'):
+            resetState(betas = (beta,))
+            inventory_a = Inventory(*INVENTORY_A)
+            inventory_b = Inventory(*INVENTORY_B)
+            seeds = fixedSeeds(20)
+            tic = default_timer()
+            if name == 'sampleMean1':
+                mean, seeds = sampleMean.sampleMean1(inventory_a, PARAM, delta, beta,
+                                                     0, True, seeds)
+            else:
+                mean, seeds = sampleMean.sampleMean2(inventory_a, inventory_b, PARAM,
+                                                     delta, beta, True, seeds)
+            toc = default_timer()
+            results.append({'function': name, 'delta': delta, 'beta': beta,
+                            'seconds': toc - tic, 'replications': len(seeds),
+                            'mean': mean})
+
+    return results
+
+
+def benchAnnealing(repeats = 100):
+    """
+    Iterations per second of end-to-end runs of simAnnealing1 and
+    simAnnealing2, with ranking and selection.
+    """
+    from SARS_rank_indep import simAnnealing1
+    from SARS_rank_joint import simAnnealing2
+
+    param = (120,) + PARAM[1:]
+    results = []
+    for name in ('simAnnealing1', 'simAnnealing2'):
+        resetState()
+        inventory_a = Inventory(*INVENTORY_A)
+        inventory_b = Inventory(*INVENTORY_B)
+        tic = default_timer()
+        with Silence():
+            if name == 'simAnnealing1':
+                result = simAnnealing1(inventory_a, 10, 50, 0.5, repeats, 0, param)
+            else:
+                result = simAnnealing2(inventory_a, inventory_b, 10, 50, 0.5,
+                                       repeats, 0, param)
+        toc = default_timer()
+        results.append({'function': name, 'iterations': repeats,
+                        'seconds': toc - tic,
+                        'iterations_per_second': repeats / (toc - tic),
+                        'best_mean': result[0],
+                        'best_policy': list(result[1:-1])})
+
+    return results
+
+
+def runSuite(path = None, quick = False):
+    """
+    Run every benchmark.
+
+    Input: name of the JSON file for the results (None to skip it), smaller
+    sizes for a quick check?
+    Output: dictionary of results.
+    """
+    if quick:
+        suite = {'simulation': benchSimulation((30, 365), 5),
+                 'demands': benchDemands((30, 365), 10),
+                 'sample_mean': benchSampleMean(((1, 0.90),)),
+                 'annealing': benchAnnealing(20)}
+    else:
+        suite = {'simulation': benchSimulation(),
+                 'demands': benchDemands(),
+                 'sample_mean': benchSampleMean(),
+                 'annealing': benchAnnealing()}
+    suite['environment'] = {'python': platform.python_version(),
+                            'numpy': np.__version__, 'scipy': scipy.__version__,
+                            'machine': platform.machine(),
+                            'processor': platform.processor(),
+                            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                            'seed': SEED}
+    if path is not None:
+        f = open(path, 'w')
+        json.dump(suite, f, indent = 2, sort_keys = True)
+        f.close()
+
+    return suite
+
+
+#******************************************************************************
+# TESTING ZONE
+#******************************************************************************
+
+def main():
+    """
+    Testing.
+    """
+    suite = runSuite('benchmark.json')
+    for bench in suite['simulation']:
+        print "Horizon %6d: %12.0f periods/s, batch %12.0f periods/s" % (
+            bench['periods'], bench['periods_per_second'],
+            bench['batch_periods_per_second'])
+    for bench in suite['demands']:
+        print "Size %8d: %14.0f demands/s, block %14.0f demands/s" % (
+            bench['size'], bench['demands_per_second'],
+            bench['block_demands_per_second'])
+    for bench in suite['sample_mean']:
+        print "%s delta %.2f beta %.2f: %.4f s, %d replications" % (
+            bench['function'], bench['delta'], bench['beta'], bench['seconds'],
+            bench['replications'])
+    for bench in suite['annealing']:
+        print "%s: %.2f iterations/s" % (bench['function'],
+                                         bench['iterations_per_second'])
+
+# uncomment next line to run the benchmarks.
+#main()
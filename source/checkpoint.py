@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 21:37:02 2026
+
+@author: Caleb Andrade
+
+Checkpoints of long simulated annealing runs: the full state of the run,
+including the states of every random number generator it draws from, is
+pickled to a file, so a preempted run can be resumed and continue exactly
+as if it had never stopped.
+"""
+import cPickle as pickle
+import os
+import random
+import numpy as np
+import sampleMean
+
+
+def rngStates():
+    """
+    States of the random number generators used by an annealing run: the
+    proposals and acceptance tests, NumPy's global generator and the
+    source of the seeds.
+    """
+    return {'random': random.getstate(), 'numpy': np.random.get_state(),
+            'seeds': sampleMean.SEED_SOURCE.getState()}
+
+
+def setRngStates(states):
+    """
+    Restore the random number generators' states saved by rngStates.
+    """
+    random.setstate(states['random'])
+    np.random.set_state(states['numpy'])
+    sampleMean.SEED_SOURCE.setState(states['seeds'])
+
+
+def seedRun(root):
+    """
+    Seed every random number generator of an annealing run from a single
+    integer, so the whole run can be reproduced.
+    """
+    random.seed(root)
+    np.random.seed(root % 2**32)
+    sampleMean.SEED_SOURCE.seed(root)
+
+
+def saveCheckpoint(path, state):
+    """
+    Save the state of a run, a dictionary. The file is written aside and
+    then renamed, so a run stopped while saving keeps its last checkpoint.
+    """
+    temp = path + '.tmp'
+    f = open(temp, 'wb')
+    pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+    f.close()
+    if os.name == 'nt' and os.path.exists(path):
+        os.remove(path)
+    os.rename(temp, path)
+
+
+def loadCheckpoint(path):
+    """
+    State of a run saved by saveCheckpoint.
+    """
+    f = open(path, 'rb')
+    state = pickle.load(f)
+    f.close()
+
+    return state
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 11:02:15 2026
+
+@author: Caleb Andrade
+"""
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from gencorrdemand import genCorrDemandBlock
+from seed_streams import isStateTuple
+
+
+def seedDigest(seed):
+    """
+    Digest of a seed: a compact seed is its own digest, a prng state tuple,
+    as returned by RandomState().get_state(), is hashed.
+    """
+    if not isStateTuple(seed):
+        return repr(tuple(int(value) for value in seed))
+    digest = hashlib.sha1(np.ascontiguousarray(seed[1]).tostring())
+    digest.update(repr((seed[0], seed[2], seed[3], seed[4])))
+    return digest.digest()
+
+
+#******************************************************************************
+# DemandCache CLASS
+#******************************************************************************
+
+class DemandCache(object):
+    """
+    Cache of generated demand streams for common random numbers. Entries are
+    addressed by the content of the prng state and the demand parameters, so
+    the same seed always maps to the same pair of demand streams. When the
+    memory budget is exceeded the least recently used streams are evicted.
+    """
+    def __init__(self, budget = 128*2**20):
+        """
+        budget : maximum number of bytes held by cached demands
+        """
+        self.budget = budget
+        self.size = 0 ## bytes currently held
+        self.entries = OrderedDict() ## key -> (demand1, demand2)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, seed, num, lambda1, lambda2, rho, antithetic = False):
+        """
+        Digest of a seed and the demand parameters.
+        """
+        return seedDigest(seed) + repr((num, lambda1, lambda2, rho, antithetic))
+
+    def store(self, key, demand1, demand2):
+        """
+        Insert a pair of read-only demand streams, evicting old entries.
+        """
+        nbytes = demand1.nbytes + demand2.nbytes
+        if nbytes > self.budget or key in self.entries:
+            return
+        while self.size + nbytes > self.budget:
+            _, (old1, old2) = self.entries.popitem(last = False)
+            self.size -= old1.nbytes + old2.nbytes
+        demand1.flags.writeable = False
+        demand2.flags.writeable = False
+        self.entries[key] = (demand1, demand2)
+        self.size += nbytes
+
+    def __call__(self, seeds, num, lambda1, lambda2, rho, antithetic = False):
+        """
+        Returns the list of demand pairs generated from 'seeds', one pair of
+        streams per seed, as a list comprehension over genCorrDemand would.
+        Missing streams are generated together with genCorrDemandBlock.
+        """
+        keys = [self.key(seed, num, lambda1, lambda2, rho, antithetic)
+                for seed in seeds]
+        missing = [j for j in range(len(keys)) if keys[j] not in self.entries]
+        found = {}
+
+        ## mark cached entries as recently used
+        for j in range(len(keys)):
+            if keys[j] in self.entries:
+                found[j] = self.entries.pop(keys[j])
+                self.entries[keys[j]] = found[j]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            demand1, demand2 = genCorrDemandBlock(len(missing), num, lambda1,
+                        lambda2, rho, seeds=[seeds[j] for j in missing],
+                        antithetic=antithetic)
+            for row in range(len(missing)):
+                j = missing[row]
+                found[j] = (demand1[row].copy(), demand2[row].copy())
+                self.store(keys[j], found[j][0], found[j][1])
+
+        return [found[j] for j in range(len(keys))]
+
+    def clear(self):
+        """
+        Drop every cached stream.
+        """
+        self.entries.clear()
+        self.size = 0
+
+    def __str__(self):
+        """
+        Cache usage as string.
+        """
+        info = '\nCached streams............. ' + str(len(self.entries)) + '\n'
+        info += 'Memory used................ ' + str(self.size) + ' bytes\n'
+        info += 'Memory budget.............. ' + str(self.budget) + ' bytes\n'
+        info += 'Hits....................... ' + str(self.hits) + '\n'
+        info += 'Misses..................... ' + str(self.misses) + '\n'
+
+        return info
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 16:07:52 2026
+
+@author: Caleb Andrade
+
+Binary store for matrices of demands (replications x periods). A store is a
+NumPy .npy file: a short header with the shape and dtype of the matrix
+followed by the raw array payload, so it can be memory-mapped and shared by
+many processes without parsing or copying it.
+"""
+import numpy as np
+from itertools import islice
+
+#******************************************************************************
+# HELPER FUNCTIONS TO STREAM A TXT FILE WITH A MATRIX OF RANDOM NUMBERS
+#******************************************************************************
+
+def readBlocks(filetxt, rows = 1000, dtype = np.float64):
+    """
+    Generator of blocks of at most 'rows' rows of a *.txt file containing a
+    matrix of random numbers. Each block is parsed in bulk into a
+    (rows x periods) array, and only one block is held in memory at a time,
+    whatever the size of the file.
+
+    Input: name of the *.txt file, rows per block, dtype of the blocks.
+    Output: blocks of demands, ready for the batch engine.
+    """
+    f = open(filetxt, 'r')
+    while True:
+        lines = list(islice(f, rows))
+        if not lines:
+            break
+        lines = [line for line in lines if line.strip()]
+        if lines:
+            block = np.fromstring(''.join(lines), dtype = dtype, sep = ' ')
+            yield block.reshape(len(lines), -1)
+    f.close()
+
+
+def readRows(filetxt, rows = 1000, dtype = np.float64):
+    """
+    Generator of the rows of a *.txt file containing a matrix of random
+    numbers, one array of demands per row, read 'rows' rows at a time.
+    """
+    for block in readBlocks(filetxt, rows, dtype):
+        for row in block:
+            yield row
+
+
+def countRows(filetxt):
+    """
+    Number of rows and periods of a *.txt file containing a matrix of random
+    numbers, read without holding the file in memory.
+    """
+    f = open(filetxt, 'r')
+    periods = len(f.readline().split())
+    count = 1 + sum(1 for line in f if line.strip())
+    f.close()
+
+    return count, periods
+
+
+#******************************************************************************
+# HELPER FUNCTIONS TO WRITE AND READ A BINARY DEMAND STORE
+#******************************************************************************
+
+def saveDemands(filebin, demands, dtype = np.float64):
+    """
+    Writes a matrix of demands into a binary store.
+
+    Input: name of the *.npy file, matrix of demands, dtype of the payload.
+    Output: shape of the matrix written.
+    """
+    demands = np.ascontiguousarray(demands, dtype = dtype)
+    np.save(filebin, demands)
+
+    return demands.shape
+
+
+def convertFile(filetxt, filebin, dtype = np.float64):
+    """
+    Converts a *.txt file containing a matrix of random numbers, as read by
+    Inventory.readFile, into a binary store. The file is streamed, so it
+    may be larger than the available memory.
+
+    Input: name of the *.txt file, name of the *.npy file, dtype of the payload.
+    Output: shape of the matrix written.
+    """
+    shape = countRows(filetxt)
+    store = np.lib.format.open_memmap(filebin, mode = 'w+', dtype = dtype,
+                                      shape = shape)
+    ## parse and write the file a block at a time
+    row = 0
+    for block in readBlocks(filetxt, 1000, dtype):
+        store[row:row + len(block)] = block
+        row += len(block)
+    store.flush()
+    del store
+
+    return shape
+
+
+def loadDemands(filebin):
+    """
+    Memory-maps a binary store, read only. Rows of the matrix are views of
+    the mapped file: they can be passed to Inventory.simulation or to the
+    batch engine without being copied into memory.
+
+    Input: name of the *.npy file.
+    Output: (replications x periods) memory-mapped array.
+    """
+    return np.load(filebin, mmap_mode = 'r')
+
+
+def demandRows(filebin, start = 0, stop = None):
+    """
+    Generator of the rows start, ..., stop - 1 of a binary store, each one a
+    zero-copy view of the mapped file.
+    """
+    demands = loadDemands(filebin)
+    if stop is None:
+        stop = demands.shape[0]
+    for row in range(start, stop):
+        yield demands[row]
+
+
+#******************************************************************************
+# TESTING ZONE
+#******************************************************************************
+
+def main():
+    """
+    Testing.
+    """
+    import time
+    from Inventory import Inventory, readFile
+
+    tic = time.clock()
+    data = readFile('../data/demand1.txt')
+    toc = time.clock()
+    print "\nText file parsing time: ", toc - tic
+
+    convertFile('../data/demand1.txt', '../data/demand1.npy')
+    tic = time.clock()
+    demands = loadDemands('../data/demand1.npy')
+    toc = time.clock()
+    print "Binary store mapping time: ", toc - tic
+    print "Shape and dtype: ", demands.shape, demands.dtype
+    print "Identical demands: ", (demands == np.array(data)).all()
+
+    inventory = Inventory(50, 3, 5, 1, 32, 0, (50, 100))
+    inventory.simulation(demands[0])
+    print "Average cost of first row: ", inventory.averageCost()
+
+    from batchSimulation import batchSimulation
+    tic = time.clock()
+    costs = [batchSimulation(inventory, block) for block in
+             readBlocks('../data/demand2.txt', 25)]
+    toc = time.clock()
+    print "\nStreamed blocks: ", len(costs)
+    print "Average cost over all rows: ", np.concatenate(costs).mean()
+    print "Streaming parse and simulation time: ", toc - tic
@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import sys
+import threading
+from seed_streams import SeedSource, setSeed
 
 #******************************************************************************
 # SeedStream CLASS
@@ -6,18 +9,23 @@
 
 class SeedStream(object):
     """
-    use to generate seeds for DemandStream
+    use to generate seeds for DemandStream. Without seed_fct, seed i is the
+    compact seed (root, i) (see seed_streams), computed on demand instead of
+    stored.
     """
-    def __init__(self, seed_fct):
+    def __init__(self, seed_fct = None, root = None):
         self.seed_fct = seed_fct
         self.seed_list = []
         self.length = 0
+        self.source = SeedSource(root)
         
     def GenerateSeeds(self, n):
         self.seed_list += [self.seed_fct() for _ in xrange(n)]
         self.length += n
         
     def __call__(self, i):
+        if self.seed_fct is None:
+            return self.source.root + (i,)
         if i < self.length:
             return self.seed_list[i]
         else:
@@ -30,32 +38,190 @@ class SeedStream(object):
          
 class DemandStream(object):
     """
-    use to generate common demands
+    use to generate common demands. Demands are generated in blocks of
+    'chunk' consecutive indices, when requested or, with 'background', by a
+    thread 'prefetch' blocks ahead of the last one requested, so generation
+    overlaps with the simulation that consumes them. An error raised while
+    generating a block is raised to the consumer that requests it. Blocks
+    behind the consumer are evicted
+    unless pinned, and an evicted block requested again is regenerated from
+    its seeds, identical; memory is bounded by prefetch + 1 blocks plus the
+    pinned ones. The worker is a thread, so generation truly overlaps the
+    simulation when it runs in NumPy code that releases the GIL, as with a
+    block_fct built on genCorrDemandBlock.
     """
-    def __init__(self, demand_fct, seed_fct):
+    def __init__(self, demand_fct, seed_fct = None, root = None, chunk = 100,
+                 prefetch = 2, block_fct = None, background = False):
         """
         demand_fct : function takes a seed to generate a list of demand
-        seed_fct : function to generate a seed
+        seed_fct : function to generate a seed, None for compact seeds
+        root : root of the compact seeds, drawn from the OS if None
+        chunk : demands per block
+        prefetch : blocks generated ahead of the consumer
+        block_fct : function takes a list of seeds to generate the list of
+        their demands at once, e.g. with genCorrDemandBlock (optional)
+        background : generate ahead in a background thread?
         """
         self.seed_fct = seed_fct
-        self.seeds = SeedStream(self.seed_fct)
+        self.seeds = SeedStream(self.seed_fct, root)
         self.demand_fct = demand_fct
-        self.demand_list = []
-        self.length = 0
-        
-    def GenerateDemands(self, n):
-        self.demand_list += [self.demand_fct(self.seeds(self.length + i)) for i in range(n)]
-        self.length += n
+        self.block_fct = block_fct
+        self.chunk = chunk
+        self.prefetch = prefetch
+        self.blocks = {} ## block number -> list of demands
+        self.pending = set() ## blocks being generated
+        self.errors = {} ## block number -> exc_info of its failed generation
+        self.pinned = set()
+        self.position = 0 ## block of the last demand requested
+        self.hits = 0 ## requests served from memory
+        self.waits = 0 ## blocks the consumer waited for
+        self.misses = 0 ## blocks generated by the consumer
+        self.closed = False
+        self.lock = threading.Condition()
+        self.worker = None
+        if background:
+            self.worker = threading.Thread(target = self.prefetchLoop)
+            self.worker.daemon = True
+            self.worker.start()
+
+    def GenerateBlock(self, b):
+        """
+        Demands of block b.
+        """
+        with self.lock: ## a seed_fct stream is not thread safe
+            seeds = [self.seeds(i) for i in range(b*self.chunk, (b + 1)*self.chunk)]
+        if self.block_fct is not None:
+            return self.block_fct(seeds)
+        return [self.demand_fct(seed) for seed in seeds]
+
+    def prefetchLoop(self):
+        """
+        Background worker: generate the missing blocks ahead of the consumer.
+        """
+        while True:
+            with self.lock:
+                while True:
+                    if self.closed:
+                        return
+                    ahead = [b for b in range(self.position, self.position + self.prefetch + 1)
+                             if b not in self.blocks and b not in self.pending
+                             and b not in self.errors]
+                    if ahead:
+                        break
+                    self.lock.wait()
+                b = ahead[0]
+                self.pending.add(b)
+            block = None
+            try:
+                block = self.GenerateBlock(b)
+            except Exception:
+                ## kept for the consumer, which raises it
+                with self.lock:
+                    self.errors[b] = sys.exc_info()
+            finally:
+                with self.lock:
+                    self.pending.discard(b)
+                    if block is not None and (b in self.pinned or
+                            self.position <= b <= self.position + self.prefetch):
+                        self.blocks[b] = block
+                    self.lock.notify_all()
+
+    def evict(self):
+        """
+        Drop the blocks out of the prefetch window that are not pinned.
+        """
+        for b in self.blocks.keys():
+            if b not in self.pinned and not self.position <= b <= self.position + self.prefetch:
+                del self.blocks[b]
+
+    def block(self, b):
+        """
+        Demands of block b, waiting for the worker or generating it.
+        """
+        with self.lock:
+            if b != self.position:
+                self.position = b
+                self.evict()
+                self.lock.notify_all()
+            if b in self.pending:
+                self.waits += 1
+                while b in self.pending:
+                    self.lock.wait()
+            if b in self.errors:
+                ## the worker failed on this block, raise its error here
+                error = self.errors.pop(b)
+                raise error[0], error[1], error[2]
+            if b in self.blocks:
+                self.hits += 1
+                return self.blocks[b]
+            self.misses += 1
+            self.pending.add(b)
+        try:
+            block = self.GenerateBlock(b)
+            with self.lock:
+                self.blocks[b] = block
+        finally:
+            with self.lock:
+                self.pending.discard(b)
+                self.lock.notify_all()
+        return block
        
     def __call__(self, i):
         """
         call DemandStream(i) to get demand[i]
         """
-        if i < self.length:
-            return self.demand_list[i]
-        else:
-            self.GenerateDemands(i-self.length + 1)
-            return self.demand_list[i]
+        return self.block(i // self.chunk)[i % self.chunk]
+
+    def stream(self, start = 0, stop = None):
+        """
+        Generator of the demands start, start + 1, ..., stop - 1 (endless if
+        stop is None).
+        """
+        i = start
+        while stop is None or i < stop:
+            yield self(i)
+            i += 1
+
+    def __iter__(self):
+        return self.stream()
+
+    def pin(self, start, stop):
+        """
+        Keep the blocks of demands start, ..., stop - 1 in memory, to reuse
+        them as common random numbers.
+        """
+        with self.lock:
+            self.pinned.update(range(start // self.chunk, (stop - 1) // self.chunk + 1))
+
+    def unpin(self):
+        """
+        Release every pinned block.
+        """
+        with self.lock:
+            self.pinned.clear()
+            self.evict()
+
+    def close(self):
+        """
+        Stop the background worker.
+        """
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        if self.worker is not None:
+            self.worker.join()
+
+    def __str__(self):
+        """
+        Usage of the stream as string.
+        """
+        info = '\nBlocks in memory........... ' + str(len(self.blocks)) + '\n'
+        info += 'Pinned blocks.............. ' + str(len(self.pinned)) + '\n'
+        info += 'Requests from memory....... ' + str(self.hits) + '\n'
+        info += 'Waits for the worker....... ' + str(self.waits) + '\n'
+        info += 'Generated on request....... ' + str(self.misses) + '\n'
+
+        return info
            
 #%%
 #import numpy as np
@@ -65,6 +231,7 @@ class DemandStream(object):
 ##demand_fct = lambda i: gcd.genCorrDemand(365, 1, 2, 0.5, seed=i)
 #demand_fct = lambda i: gcd.genCorrDemand(365, 1, 2, 0.5)
 #seed_fct = lambda : np.random.RandomState().get_state()
+## or leave seed_fct out to use compact seeds (root, i)
 #
 
 # generate some demands
@@ -77,6 +244,15 @@ class DemandStream(object):
 #data3 =  demand_generator(100)
 #data4 =  demand_generator(100)
 
+# iterate over the demands of 1000 replications, generated in blocks of 50
+# by genCorrDemandBlock, keeping the first 100 for common random numbers
+#block_fct = lambda seeds: zip(*gcd.genCorrDemandBlock(len(seeds), 365, 1, 2, 0.5, seeds=seeds))
+#demand_generator = DemandStream(None, None, 7, 50, 2, block_fct, background=True)
+#demand_generator.pin(0, 100)
+#for demands in demand_generator.stream(0, 1000):
+#    pass
+#demand_generator.close()
+
 #%%
 
 #******************************************************************************
@@ -89,7 +265,8 @@ from scipy.stats import norm
 
 def genCorrDemand(num, lambda1, lambda2, rho, **options):
     """
-    use arg "seed=" to input a seed from np.random.RandomState().get_state()
+    use arg "seed=" to input a compact seed (root, index) or a seed from
+    np.random.RandomState().get_state()
     
     Returns two lists of size 'num' with random generated numbers:
     'demand1' and 'demand2', that belong to two correlated
@@ -99,7 +276,7 @@ def genCorrDemand(num, lambda1, lambda2, rho, **options):
     prng = np.random.RandomState()
     
     if options.has_key("seed"):
-        prng.set_state(options.get("seed"))
+        setSeed(prng, options.get("seed"))
             
     mean = [0, 0]
     matrix = np.matrix([[1,rho],[rho,1]])
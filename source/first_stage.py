@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Mon Oct 19 09:14:52 2026
+
+@author: Caleb Andrade
+
+Adaptive first stage size of the two-stage ranking and selection
+procedures, shared by sampleMean and rankSelect.
+"""
+from h_constants import hValue
+
+## replications of the pilot and largest first stage of the adaptive mode
+PILOT = 5
+N0_MAX = 50
+
+
+def firstStageSize(variance, delta, beta, pilot = PILOT, k = 2):
+    """
+    First stage size for the adaptive mode: the n0 that minimizes the
+    expected total replications of the two-stage procedure,
+    max(n0 + 1, variance*h(n0)^2 / delta^2), for a variance estimated from a
+    pilot. Low variance costs get a small first stage, noisy ones a larger
+    first stage and so a smaller h. Only the h of this beta is solved for
+    every candidate n0, the full table is built for the n0 chosen alone.
+    
+    Input: pilot variance, precision, probability, pilot size, systems.
+    Output: n0.
+    """
+    best_n0, best_total = None, None
+    for n0 in range(max(pilot, 2), N0_MAX + 1):
+        h = hValue(beta, n0, k)
+        total = max(n0 + 1, 1 + int(variance*(h**2) / delta**2))
+        if best_total is None or total < best_total:
+            best_n0, best_total = n0, total
+    
+    return best_n0
@@ -5,24 +5,31 @@
 import numpy as np
 import math
 from scipy.stats import norm
+from scipy.special import ndtr
+from seed_streams import setSeed
 
 def genCorrDemand(num, lambda1, lambda2, rho, **options):
     """
     Returns two lists of size 'num' with random generated numbers:
     'demand1' and 'demand2', that belong to two correlated
-    random variates.
+    random variates. Use arg "seed=" to input a seed, a compact seed such
+    as (root, index) or a prng state tuple (see seed_streams). Use arg
+    "antithetic=True" to get the antithetic streams of the same seed.
     """
     
     prng = np.random.RandomState()
     
     if options.has_key("seed"):
-        prng.set_state(options.get("seed"))
+        setSeed(prng, options.get("seed"))
             
     mean = [0, 0]
     matrix = np.matrix([[1,rho],[rho,1]])
-    dlam1 = -1 / lambda1
-    dlam2 = -1 / lambda2
+    ## rates as floats, -1 / lambda would floor for integer rates
+    dlam1 = -1.0 / float(lambda1)
+    dlam2 = -1.0 / float(lambda2)
     data = prng.multivariate_normal(mean, matrix, num)
+    if options.get("antithetic", False):
+        data = -data
     demand1 = []
     demand2 = []
     for idx in range(num):
@@ -30,6 +37,111 @@ def genCorrDemand(num, lambda1, lambda2, rho, **options):
         demand2.append(dlam2*math.log(norm.cdf(data[idx][1])))
     
     return demand1, demand2
+
+
+def genCorrDemandBlock(repeats, num, lambda1, lambda2, rho, **options):
+    """
+    Vectorized genCorrDemand for many replications at once. Returns two
+    C-contiguous arrays of shape (repeats, num): 'demand1' and 'demand2',
+    whose rows are pairs of correlated exponential demand streams.
+    
+    Use arg "seeds=" to input a list with one seed per replication, row j
+    is then the same stream genCorrDemand returns for seeds[j]. Use arg
+    "seed=" to draw the whole block from a single seed instead.
+    Use arg "dtype=np.float32" to halve the memory of the output.
+    Use arg "antithetic=True" to get the antithetic streams, which share
+    the marginals and correlation but are negatively correlated with the
+    streams of the same seeds.
+    """
+    dtype = options.get("dtype", np.float64)
+    mean = [0, 0]
+    matrix = np.array([[1, rho], [rho, 1]])
+    
+    if options.has_key("seeds"):
+        seeds = options.get("seeds")
+        data = np.empty((repeats, num, 2))
+        prng = np.random.RandomState()
+        for rep in range(repeats):
+            setSeed(prng, seeds[rep])
+            data[rep] = prng.multivariate_normal(mean, matrix, num)
+    else:
+        prng = np.random.RandomState()
+        if options.has_key("seed"):
+            setSeed(prng, options.get("seed"))
+        data = prng.multivariate_normal(mean, matrix, (repeats, num))
+    
+    ## one contiguous (repeats x num) plane per product, transformed in place
+    ## from normal to uniform to exponential variates
+    data = np.ascontiguousarray(np.rollaxis(data, 2))
+    if options.get("antithetic", False):
+        np.negative(data, out=data)
+    ndtr(data, out=data)
+    np.log(data, out=data)
+    data[0] *= -1.0 / float(lambda1)
+    data[1] *= -1.0 / float(lambda2)
+    
+    if dtype != np.float64:
+        data = data.astype(dtype)
+    
+    return data[0], data[1]
+    
+
+## Cholesky factors of the correlation matrices used so far
+CHOLESKY = {}
+
+def choleskyFactor(corr):
+    """
+    Lower triangular factor L of a correlation matrix, corr = L L^T. It is
+    computed once per matrix and cached.
+    """
+    corr = np.ascontiguousarray(corr, dtype=np.float64)
+    key = (corr.shape, corr.tostring())
+    if not CHOLESKY.has_key(key):
+        CHOLESKY[key] = np.linalg.cholesky(corr)
+    
+    return CHOLESKY[key]
+    
+
+def genCorrDemandN(repeats, num, lambdas, corr, **options):
+    """
+    genCorrDemandBlock for N products. Returns a C-contiguous array of shape
+    (N, repeats, num) whose plane i holds the demand streams of product i,
+    exponential with rate lambdas[i]; products are correlated through the
+    N x N correlation matrix 'corr' of the underlying normal variates, whose
+    Cholesky factor is cached. Options "seeds", "seed", "dtype" and
+    "antithetic" work as in genCorrDemandBlock. The normal variates are
+    drawn as L*z, not by multivariate_normal, so for N = 2 the streams are
+    not those of genCorrDemandBlock, only their distribution is.
+    """
+    dtype = options.get("dtype", np.float64)
+    factor = choleskyFactor(corr)
+    products = len(factor)
+    
+    prng = np.random.RandomState()
+    if options.has_key("seeds"):
+        seeds = options.get("seeds")
+        data = np.empty((products, repeats, num))
+        for rep in range(repeats):
+            setSeed(prng, seeds[rep])
+            data[:, rep] = np.dot(factor, prng.standard_normal((products, num)))
+    else:
+        if options.has_key("seed"):
+            setSeed(prng, options.get("seed"))
+        normal = prng.standard_normal((products, repeats*num))
+        data = np.dot(factor, normal).reshape(products, repeats, num)
+    
+    ## from normal to uniform to exponential variates, in place
+    if options.get("antithetic", False):
+        np.negative(data, out=data)
+    ndtr(data, out=data)
+    np.log(data, out=data)
+    data *= (-1.0 / np.asarray(lambdas, dtype=np.float64))[:, None, None]
+    
+    if dtype != np.float64:
+        data = data.astype(dtype)
+    
+    return data
+    
     
 def main():
     """
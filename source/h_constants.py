@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 19:40:18 2026
+
+@author: Caleb Andrade
+
+Constants h of the two-stage ranking and selection procedures, for any
+first stage size n0, probability of correct selection beta and number of
+systems k. Tables are computed for any (n0, k), saved on disk and served
+by linear interpolation on a uniform grid of beta, in O(1).
+"""
+import json
+import os
+import numpy as np
+from numpy.polynomial.legendre import leggauss
+from scipy.special import ndtr, stdtr, stdtrit, roots_genlaguerre, gammaln
+from scipy.optimize import brentq
+
+## uniform grid of beta where h is tabulated
+BETA_MIN = 0.5
+BETA_MAX = 0.9995
+BETA_STEP = 0.0005
+## grid of h where the probability of correct selection is computed, it is
+## doubled, up to H_MAX, while the probability at its top is below BETA_MAX
+H_GRID = np.linspace(0, 12, 1201)
+H_MAX = 768.0
+
+CACHE_FILE = os.path.join(os.path.expanduser('~'), '.inventory_control',
+                          'h_constants.json')
+
+#******************************************************************************
+# PROBABILITY OF CORRECT SELECTION
+#******************************************************************************
+
+def ddProbability(h_grid, n0, k, nodes = 128):
+    """
+    Probability of correct selection of the Dudewicz-Dalal procedure for
+    every h in 'h_grid': integral of F(t + h)^(k - 1) f(t) dt, with F, f the
+    cdf and pdf of the t distribution with n0 - 1 degrees of freedom,
+    computed as an integral over u = F(t) with Gauss-Legendre quadrature.
+    """
+    nu = n0 - 1
+    x, w = leggauss(nodes)
+    t = stdtrit(nu, (x + 1) / 2.0)
+    h = np.asarray(h_grid, dtype=float)[:, None]
+    return np.dot(stdtr(nu, t[None, :] + h)**(k - 1), w / 2.0)
+
+
+def rinottProbability(h_grid, n0, k, nodes = 64):
+    """
+    Probability of correct selection of Rinott's procedure for every h in
+    'h_grid': E[ E[ Phi(h / sqrt((n0 - 1)(1/X + 1/Y))) | Y ]^(k - 1) ],
+    with X, Y independent chi-square variates with n0 - 1 degrees of
+    freedom, computed with generalized Gauss-Laguerre quadrature.
+    """
+    nu = n0 - 1
+    u, w = roots_genlaguerre(nodes, nu / 2.0 - 1)
+    x = 2*u ## chi-square nodes
+    w = w / np.exp(gammaln(nu / 2.0)) ## chi-square weights
+    h = np.asarray(h_grid, dtype=float)[:, None, None]
+    scale = np.sqrt(nu*(1 / x[:, None] + 1 / x[None, :]))
+    inner = np.dot(ndtr(h / scale), w) ## expectation over X, for every Y
+    return np.dot(inner**(k - 1), w)
+
+
+#******************************************************************************
+# HTable CLASS
+#******************************************************************************
+
+class HTable(object):
+    """
+    Table of h constants for a given (n0, k) and procedure, tabulated on a
+    uniform grid of beta. Tables are computed once and saved in a json file.
+    """
+    def __init__(self, n0, k = 2, method = 'dd', path = CACHE_FILE):
+        """
+        n0 : first stage size, k : number of systems compared,
+        method : 'dd' (Dudewicz-Dalal) or 'rinott', path : cache file
+        """
+        self.n0 = n0
+        self.k = k
+        self.method = method
+        self.path = path
+        key = '%s-%d-%d' % (method, n0, k)
+        cache = self.load()
+        ## a table is strictly increasing, a flat top was capped by the grid
+        if key in cache and cache[key][-1] > cache[key][-2]:
+            self.h = np.array(cache[key])
+        else:
+            self.h = self.compute()
+            ## reload, keeping tables saved by other processes meanwhile
+            cache = self.load()
+            cache[key] = self.h.tolist()
+            self.save(cache)
+
+    def probability(self, h_grid):
+        """
+        Probability of correct selection of the procedure for every h in
+        'h_grid', computed by slices of the size of H_GRID to bound memory.
+        """
+        if self.method == 'rinott':
+            fct = rinottProbability
+        else:
+            fct = ddProbability
+        size = len(H_GRID)
+        return np.concatenate([fct(h_grid[i:i + size], self.n0, self.k)
+                               for i in range(0, len(h_grid), size)])
+
+    def compute(self):
+        """
+        Solve for h on the grid of beta, interpolating the probability of
+        correct selection computed on a fine grid of h. The grid of h is
+        extended until the probability at its top reaches BETA_MAX, so no
+        h of the table is capped by the grid.
+        """
+        h_grid = H_GRID
+        prob = self.probability(h_grid)
+        step = H_GRID[1] - H_GRID[0]
+        while prob[-1] < BETA_MAX:
+            if h_grid[-1] >= H_MAX:
+                raise ValueError("h for beta = %s, n0 = %d, k = %d exceeds %s"
+                                 % (BETA_MAX, self.n0, self.k, H_MAX))
+            more = h_grid[-1] + step*np.arange(1, len(h_grid))
+            h_grid = np.concatenate((h_grid, more))
+            prob = np.concatenate((prob, self.probability(more)))
+        ## probability is increasing in h, keep it strictly so to invert it
+        prob = np.maximum.accumulate(prob)
+        betas = np.arange(BETA_MIN, BETA_MAX + BETA_STEP / 2, BETA_STEP)
+        return np.interp(betas, prob, h_grid)
+
+    def __call__(self, beta):
+        """
+        Returns h for the probability of correct selection beta, which must
+        lie in [BETA_MIN, BETA_MAX].
+        """
+        if not BETA_MIN <= beta <= BETA_MAX:
+            raise ValueError("beta = %s outside the tabulated range [%s, %s]"
+                             % (beta, BETA_MIN, BETA_MAX))
+        pos = (beta - BETA_MIN) / BETA_STEP
+        pos = min(pos, len(self.h) - 1)
+        i = min(int(pos), len(self.h) - 2)
+        frac = pos - i
+        return (1 - frac)*self.h[i] + frac*self.h[i + 1]
+
+    def load(self):
+        """
+        Tables saved on disk, as a dictionary. A missing or unreadable file
+        is an empty cache, the tables are then computed again.
+        """
+        try:
+            f = open(self.path, 'r')
+            try:
+                cache = json.load(f)
+            finally:
+                f.close()
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict):
+            return {}
+        return cache
+
+    def save(self, cache):
+        """
+        Save tables on disk. The file is written aside and then renamed, so
+        a process reading the cache never sees it half written.
+        """
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            try:
+                os.makedirs(folder)
+            except OSError: ## made by another process meanwhile
+                pass
+        temp = '%s.%d.tmp' % (self.path, os.getpid())
+        f = open(temp, 'w')
+        json.dump(cache, f)
+        f.close()
+        if os.name == 'nt' and os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(temp, self.path)
+
+
+## tables already loaded, by (n0, k, method)
+TABLES = {}
+
+def hConstant(beta, n0 = 20, k = 2, method = 'dd'):
+    """
+    Returns the constant h for probability of correct selection beta, first
+    stage size n0 and k systems.
+    """
+    if (n0, k, method) not in TABLES:
+        TABLES[(n0, k, method)] = HTable(n0, k, method)
+    return TABLES[(n0, k, method)](beta)
+
+
+## single constants solved so far, by (beta, n0, k, method)
+H_VALUES = {}
+
+def hValue(beta, n0 = 20, k = 2, method = 'dd'):
+    """
+    Returns the constant h for a single (beta, n0, k), solving for the root
+    of the probability of correct selection instead of building the whole
+    table of n0. Cheap enough to scan many n0 for one beta, as the adaptive
+    first stage does; kept in memory only.
+    """
+    if not BETA_MIN <= beta <= BETA_MAX:
+        raise ValueError("beta = %s outside the tabulated range [%s, %s]"
+                         % (beta, BETA_MIN, BETA_MAX))
+    key = (beta, n0, k, method)
+    if key not in H_VALUES:
+        if method == 'rinott':
+            prob = lambda h: rinottProbability([h], n0, k)[0] - beta
+        else:
+            ## quadrature of ddProbability, nodes computed once
+            x, w = leggauss(128)
+            t = stdtrit(n0 - 1, (x + 1) / 2.0)
+            prob = lambda h: np.dot(stdtr(n0 - 1, t + h)**(k - 1), w / 2.0) - beta
+        ## double the bracket until it holds the root
+        top = H_GRID[-1]
+        while prob(top) < 0:
+            if top >= H_MAX:
+                raise ValueError("h for beta = %s, n0 = %d, k = %d exceeds %s"
+                                 % (beta, n0, k, H_MAX))
+            top *= 2
+        H_VALUES[key] = brentq(prob, H_GRID[0], top, xtol = 1e-10)
+    return H_VALUES[key]
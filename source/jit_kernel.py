@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 23:48:21 2026
+
+@author: Caleb Andrade
+
+Compiled simulation kernel: the (s, S) dynamics of Inventory.onePeriodSim
+and Inventory.onePeriodCost (or Inventory.pipelineSim in pipeline mode) as
+a scalar loop over an array of demands, compiled with Numba when it is
+installed. Without Numba the batch engine of batchSimulation.py is used
+instead; the choice is made once, at import, and reported by KERNEL.
+batchRepSimulation, which runs the replications of sampleMean and
+rankSelect, goes through the compiled kernel when there is one.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    COMPILED = True
+except ImportError:
+    COMPILED = False
+
+    def njit(*args, **kwargs):
+        """
+        Stand-in for numba.njit: leaves the function as it is.
+        """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fct: fct
+
+## name of the kernel selected at import
+KERNEL = 'numba' if COMPILED else 'numpy'
+
+
+#******************************************************************************
+# SCALAR KERNEL
+#******************************************************************************
+
+def scalarCosts(demands, level, item_cost, backlog_cost, hold_cost,
+                setup_cost, lead_time, low, top, pipeline):
+    """
+    Average cost of every row of a (replications x periods) array of
+    demands, each row simulated from the initial level one period at a time
+    with the update rules of Inventory. Operations are done in the same
+    order as in Inventory, so costs are equal to Inventory.averageCost().
+
+    Input: demands, initial level, costs, lead time (a float, compared to
+    the order delay as Inventory does), policy (s, S), is the inventory in
+    pipeline mode?
+    Output: array of average costs, one per replication.
+    """
+    replications, periods = demands.shape
+    costs = np.empty(replications)
+    slots = max(1, int(lead_time)) ## as pipelineSlots
+    ring = np.zeros(slots) ## scheduled arrivals, pipeline mode only
+
+    for rep in range(replications):
+        current_level = level
+        current = 0.0 ## number of items to arrive
+        delay = 0 ## periods after an order was placed
+        ongoing = False ## is there an order going on?
+        ring[:] = 0.0
+        ## cost of the initial state, as recorded by Inventory.__init__
+        total = max(0.0, current_level)*hold_cost + max(0.0, -current_level)*backlog_cost
+
+        for period in range(periods):
+            ## update inventory level and backlog
+            order = 0.0
+            current_level = current_level - demands[rep, period]
+            backlog = max(0.0, -current_level)
+
+            if pipeline:
+                ## receive the items scheduled, order on the position
+                head = period % slots
+                current_level = current_level + ring[head]
+                current = current - ring[head]
+                position = current_level + current
+                if position < low:
+                    order = top - position
+                    current = current + order
+                ring[head] = order
+            else:
+                ## has order arrived? reset order's variables
+                if delay >= lead_time:
+                    current_level = current_level + current
+                    current = 0.0
+                    delay = 0
+                    ongoing = False
+                ## place an order?
+                if current_level < low and not ongoing:
+                    order = top - current_level
+                    current = order
+                    ongoing = True
+                ## update order delay time
+                if ongoing:
+                    delay += 1
+
+            ## one period cost, setup and item costs only the day an order is placed
+            cost = max(0.0, current_level)*hold_cost + backlog*backlog_cost
+            if order != 0:
+                cost = cost + (setup_cost + item_cost*order)
+            total = total + cost
+
+        costs[rep] = total / (periods + 1)
+
+    return costs
+
+## compiled version, the same function if Numba is missing
+compiledCosts = njit(cache = True)(scalarCosts)
+
+
+def kernelSimulation(inventory, demands):
+    """
+    Simulate all replications of an inventory with the kernel selected at
+    import: the compiled scalar loop, or batchSimulation without Numba.
+
+    Input: inventory, (replications x periods) matrix of demands.
+    Output: array with the average cost of every replication.
+    """
+    demands = np.asarray(demands, dtype=np.float64)
+    if not COMPILED:
+        ## imported here, batchSimulation imports this module
+        from batchSimulation import batchSimulation
+        return batchSimulation(inventory, demands)
+    demands = np.ascontiguousarray(demands.reshape(-1, demands.shape[-1]))
+
+    return compiledCosts(demands, float(inventory.initial_level),
+                         float(inventory.item_cost), float(inventory.backlog_cost),
+                         float(inventory.hold_cost), float(inventory.setup_cost),
+                         float(inventory.lead_time), float(inventory.low),
+                         float(inventory.top), inventory.pipeline is not None)
+
+
+#******************************************************************************
+# TESTING ZONE
+#******************************************************************************
+
+def main(replications = 200, periods = 365):
+    """
+    Testing: the kernel against the reference class, in both modes and for
+    several lead times, and its running time. Raises AssertionError on the
+    first lead time and mode whose costs differ.
+    """
+    import time
+    from Inventory import Inventory
+
+    print "\nKernel selected: ", KERNEL
+    if not COMPILED:
+        print "Numba is missing, the compiled path is not checked"
+    prng = np.random.RandomState(0)
+    demands = prng.exponential(1 / 0.12, (replications, periods))
+    for lead_time in (0, 1, 3, 14, 2.5):
+        for pipeline in (False, True):
+            inventory = Inventory(50, 3, 5, 1, 32, lead_time, (50, 100),
+                                  pipeline = pipeline)
+            tic = time.clock()
+            reference = []
+            for row in demands:
+                temp_inventory = inventory.clone()
+                temp_inventory.simulation(row)
+                reference.append(temp_inventory.averageCost())
+            toc = time.clock()
+            kernel_time = time.clock()
+            costs = kernelSimulation(inventory, demands)
+            kernel_time = time.clock() - kernel_time
+            ## the scalar loop itself, compiled if Numba is installed
+            scalar = compiledCosts(demands[:10], 50.0, 3.0, 5.0, 1.0, 32.0,
+                                   float(lead_time), 50.0, 100.0, pipeline)
+            if costs.tolist() != reference or scalar.tolist() != reference[:10]:
+                raise AssertionError("%s kernel differs from Inventory, lead time %s, "
+                                     "pipeline %s" % (KERNEL, lead_time, pipeline))
+            print "Lead time %4.1f, pipeline %-5s: identical, %.4f s vs %.4f s" % (
+                lead_time, pipeline, toc - tic, kernel_time)
+
+# uncomment next line to check the kernel against Inventory.
+#main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 13:41:09 2026
+
+@author: Caleb Andrade
+"""
+import multiprocessing
+from batchSimulation import batchRepSimulation
+from demand_cache import DemandCache
+
+## every worker process keeps its own cache of demand streams
+WORKER_CACHE = DemandCache()
+
+
+def runChunk(args):
+    """
+    Worker task: regenerate the demands of a chunk of seeds and simulate
+    the inventory on them.
+
+    Input: tuple (inventory, random demands' parameters, index, seeds,
+    antithetic).
+    Output: a list with average costs of every run.
+    """
+    inventory, param, index, seeds, antithetic = args
+    demands_list = WORKER_CACHE(seeds, param[0], param[1], param[2], param[3],
+                                antithetic)
+
+    return batchRepSimulation(inventory, demands_list, len(seeds), index)
+
+
+#******************************************************************************
+# ReplicationPool CLASS
+#******************************************************************************
+
+class ReplicationPool(object):
+    """
+    Pool of worker processes that run replications of an inventory's
+    simulation in parallel. Only the seeds travel to the workers, which
+    regenerate the demands themselves; costs come back in seed order, so
+    statistics are identical to the serial ones.
+    """
+    def __init__(self, workers = None, chunk = None):
+        """
+        workers : number of processes, defaults to the number of cores
+        chunk : replications per task, defaults to an even split of every
+        request among the workers
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        self.chunk = chunk
+        self.pool = multiprocessing.Pool(self.workers)
+
+    def __call__(self, inventory, param, index, seeds, antithetic = False):
+        """
+        Simulate a fresh inventory once per seed.
+
+        Input: inventory, random demands' parameters, index of inventory,
+        list of seeds, use the antithetic demand streams?
+        Output: a list with average costs of every run.
+        """
+        chunk = self.chunk or max(1, -(-len(seeds) // self.workers))
+        tasks = [(inventory, param, index, seeds[j:j + chunk], antithetic)
+                 for j in range(0, len(seeds), chunk)]
+        avg = []
+        for costs in self.pool.map(runChunk, tasks):
+            avg += costs
+
+        return avg
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        self.pool.close()
+        self.pool.join()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 12:20:47 2026
+
+@author: Caleb Andrade
+"""
+from collections import OrderedDict
+from demand_cache import seedDigest
+
+#******************************************************************************
+# PolicyCache CLASS
+#******************************************************************************
+
+class PolicyCache(object):
+    """
+    Memo of the replication costs of every policy evaluated on a seed list.
+    Simulated annealing proposes neighbours within +/- 5 units, so the chain
+    revisits policies it already scored on the same seeds; those are served
+    from the memo, and a request for more replications than stored only
+    simulates the missing ones.
+    """
+    def __init__(self, demand_fct, rep_simulation, max_entries = 100000):
+        """
+        demand_fct : function taking (seeds, num, lambda1, lambda2, rho,
+        antithetic) that returns a list of demands, one pair of streams per
+        seed
+        rep_simulation : function with the signature of repSimulation
+        max_entries : number of policies kept before evicting the least
+        recently used one
+        """
+        self.demand_fct = demand_fct
+        self.rep_simulation = rep_simulation
+        self.max_entries = max_entries
+        self.entries = OrderedDict() ## key -> [seed digests, costs]
+        self.hits = 0 ## revisits served entirely from the memo
+        self.extensions = 0 ## revisits that needed more replications
+        self.misses = 0
+
+    def key(self, inventory, param, index, antithetic = False):
+        """
+        Inventory parameters, ordering mode, policy and demand parameters of
+        an evaluation.
+        """
+        return (inventory.initial_level, inventory.item_cost,
+                inventory.backlog_cost, inventory.hold_cost,
+                inventory.setup_cost, inventory.lead_time,
+                inventory.pipeline is not None, inventory.getPolicy(),
+                tuple(param), index, antithetic)
+
+    def costs(self, inventory, param, index, seeds, repeats, pool = None,
+              antithetic = False):
+        """
+        Average costs of the inventory's simulation on the first 'repeats'
+        seeds, as repSimulation returns them.
+
+        Input: inventory, random demands' parameters, index of inventory,
+        list of seeds, number of replications. As an option, pool is a
+        ReplicationPool that runs the missing replications in parallel, and
+        antithetic selects the antithetic demand streams of the seeds.
+        Output: a list with average costs of every run.
+        """
+        ## a used inventory carries its histories into the first run
+        if inventory.getPeriods() != 0:
+            return self.simulate(inventory, param, index, seeds, 0, repeats,
+                                 None, antithetic)
+
+        digests = [seedDigest(seeds[j]) for j in range(repeats)]
+
+        key = self.key(inventory, param, index, antithetic)
+        if key in self.entries:
+            known, avg = self.entries.pop(key)
+        else:
+            known, avg = [], []
+
+        ## length of the prefix of replications already simulated
+        stored = 0
+        while stored < min(len(known), repeats) and known[stored] == digests[stored]:
+            stored += 1
+
+        if stored == repeats:
+            self.hits += 1
+        elif stored > 0:
+            self.extensions += 1
+        else:
+            self.misses += 1
+
+        if stored < repeats:
+            avg = avg[:stored] + self.simulate(inventory, param, index, seeds,
+                                               stored, repeats, pool, antithetic)
+            known = digests
+        self.entries[key] = [known, avg]
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+
+        return avg[:repeats]
+
+    def simulate(self, inventory, param, index, seeds, start, stop, pool = None,
+                 antithetic = False):
+        """
+        Simulate replications start, ..., stop - 1.
+        """
+        if pool is not None:
+            return pool(inventory, param, index, seeds[start:stop], antithetic)
+        demands_list = self.demand_fct(seeds[start:stop], param[0], param[1],
+                                       param[2], param[3], antithetic)
+        return self.rep_simulation(inventory, demands_list, stop - start, index)
+
+    def clear(self):
+        """
+        Drop every memoized policy.
+        """
+        self.entries.clear()
+
+    def __str__(self):
+        """
+        Memo usage as string.
+        """
+        info = '\nMemoized policies.......... ' + str(len(self.entries)) + '\n'
+        info += 'Revisits................... ' + str(self.hits) + '\n'
+        info += 'Extended revisits.......... ' + str(self.extensions) + '\n'
+        info += 'Misses..................... ' + str(self.misses) + '\n'
+
+        return info
+
+
+#******************************************************************************
+# TESTING ZONE
+#******************************************************************************
+
+def main():
+    """
+    Testing: one cache and one seed set for an inventory with one order at
+    a time and the same inventory with an order pipeline, each must get
+    its own costs.
+    """
+    from Inventory import Inventory
+    from sampleMean import sampleMean1, genSeeds, POLICY_CACHE
+
+    param = (365, 0.12, 0.10, -0.8)
+    seeds = genSeeds(20)
+    single = Inventory(50, 3, 5, 1, 32, 14, (50, 100))
+    pipeline = Inventory(50, 3, 5, 1, 32, 14, (50, 100), pipeline = True)
+
+    POLICY_CACHE.clear()
+    mean_single = sampleMean1(single, param, 1, 0.9, 0, False, list(seeds))[0]
+    mean_pipeline = sampleMean1(pipeline, param, 1, 0.9, 0, False, list(seeds))[0]
+    POLICY_CACHE.clear()
+    fresh = sampleMean1(pipeline, param, 1, 0.9, 0, False, list(seeds))[0]
+
+    print "\nSingle order mean: ", mean_single
+    print "Pipeline mean: ", mean_pipeline
+    print "Pipeline mean, empty cache: ", fresh
+    print "Modes cached apart: ", mean_pipeline == fresh != mean_single
+
+# uncomment next line to check the cache against both ordering modes.
+#main()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 22:18:45 2026
+
+@author: Caleb Andrade
+
+Opt-in instrumentation of the simulation stack. While a Profiler is
+enabled, the hot functions listed in TARGETS are replaced, in every module
+of the project that refers to them, by wrappers that count their calls and
+time them; disabling it puts the original functions back. When disabled
+nothing is wrapped, so the instrumentation costs nothing.
+
+Times are inclusive: the time of sampleMean1 contains the time of the
+simulations it runs. Replications run by a ReplicationPool happen in other
+processes and are not seen.
+"""
+import os
+import sys
+from timeit import default_timer
+
+## (category, module, function or Class.method) of the instrumented functions
+TARGETS = [('demands', 'gencorrdemand', 'genCorrDemand'),
+           ('demands', 'gencorrdemand', 'genCorrDemandBlock'),
+           ('clone', 'Inventory', 'Inventory.clone'),
+           ('simulation', 'Inventory', 'Inventory.simulation'),
+           ('simulation', 'batchSimulation', 'batchRepSimulation'),
+           ('simulation', 'jit_kernel', 'kernelSimulation'),
+           ('statistics', 'sampleMean', 'statMeasures'),
+           ('statistics', 'rankSelect', 'statMeasures'),
+           ('sample mean', 'sampleMean', 'sampleMean1'),
+           ('sample mean', 'sampleMean', 'sampleMean2'),
+           ('acceptance', 'SARS_rank_indep', 'metropolis'),
+           ('acceptance', 'SARS_no_rank_indep', 'metropolis'),
+           ('acceptance', 'SARS_rank_joint', 'metropolis'),
+           ('acceptance', 'SARS_no_rank_joint', 'metropolis')]
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def projectModules():
+    """
+    Modules of the project already imported.
+    """
+    modules = []
+    for module in sys.modules.values():
+        path = getattr(module, '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == SOURCE_DIR:
+            modules.append(module)
+
+    return modules
+
+
+#******************************************************************************
+# Profiler CLASS
+#******************************************************************************
+
+class Profiler(object):
+    """
+    Call counts and times of the functions in TARGETS.
+    """
+    def __init__(self):
+        self.records = {} ## name -> [category, calls, seconds]
+        self.patches = [] ## (owner, attribute, original function)
+
+    def wrap(self, name, category, fct):
+        """
+        Wrapper of a function that records its calls into 'name'.
+        """
+        record = self.records.setdefault(name, [category, 0, 0.0])
+
+        def timed(*args, **kwargs):
+            tic = default_timer()
+            try:
+                return fct(*args, **kwargs)
+            finally:
+                record[1] += 1
+                record[2] += default_timer() - tic
+
+        timed.__name__ = fct.__name__
+        timed.__doc__ = fct.__doc__
+        return timed
+
+    def enable(self):
+        """
+        Replace the functions in TARGETS by their timed wrappers, in the
+        modules imported so far.
+        """
+        if self.patches:
+            return
+        modules = projectModules()
+        for category, module_name, name in TARGETS:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            if '.' in name:
+                class_name, attribute = name.split('.')
+                owner = getattr(module, class_name)
+                original = owner.__dict__[attribute]
+                self.patches.append((owner, attribute, original))
+                setattr(owner, attribute, self.wrap(module_name + '.' + name,
+                                                    category, original))
+                continue
+            ## every module that imported the function holds its own name
+            original = getattr(module, name)
+            timed = self.wrap(module_name + '.' + name, category, original)
+            for owner in modules:
+                for attribute, value in vars(owner).items():
+                    if value is original:
+                        self.patches.append((owner, attribute, original))
+                        setattr(owner, attribute, timed)
+
+    def disable(self):
+        """
+        Put the original functions back.
+        """
+        for owner, attribute, original in reversed(self.patches):
+            setattr(owner, attribute, original)
+        self.patches = []
+
+    def reset(self):
+        """
+        Forget the recorded calls.
+        """
+        for record in self.records.values():
+            record[1] = 0
+            record[2] = 0.0
+
+    def report(self):
+        """
+        Structured report: calls, seconds and seconds per call of every
+        function, and calls and seconds by category.
+        """
+        functions = {}
+        categories = {}
+        for name, (category, calls, seconds) in self.records.items():
+            if calls == 0:
+                continue
+            functions[name] = {'category': category, 'calls': calls,
+                               'seconds': seconds, 'per_call': seconds / calls}
+            total = categories.setdefault(category, {'calls': 0, 'seconds': 0.0})
+            total['calls'] += calls
+            total['seconds'] += seconds
+
+        return {'functions': functions, 'categories': categories}
+
+
+## profiler used by profileRun
+PROFILER = Profiler()
+
+
+def profileRun(fct, *args, **kwargs):
+    """
+    Run a function, typically an annealing run such as simAnnealing1, with
+    the instrumentation enabled.
+
+    Input: function and its arguments.
+    Output: result of the function, report of the run (see Profiler.report)
+    with its total time under 'seconds'.
+    """
+    PROFILER.reset()
+    PROFILER.enable()
+    tic = default_timer()
+    try:
+        result = fct(*args, **kwargs)
+    finally:
+        toc = default_timer()
+        PROFILER.disable()
+    report = PROFILER.report()
+    report['seconds'] = toc - tic
+
+    return result, report
+
+
+def printReport(report):
+    """
+    Print a report of profileRun as a table, by category and by function.
+    """
+    print "\nTotal time: ", report['seconds']
+    print "\n%-12s %10s %12s" % ('Category', 'Calls', 'Seconds')
+    for category, total in sorted(report['categories'].items()):
+        print "%-12s %10d %12.4f" % (category, total['calls'], total['seconds'])
+    print "\n%-40s %10s %12s %12s" % ('Function', 'Calls', 'Seconds', 'Per call')
+    for name, record in sorted(report['functions'].items()):
+        print "%-40s %10d %12.4f %12.6f" % (name, record['calls'],
+                                            record['seconds'], record['per_call'])
+
+
+#******************************************************************************
+# TESTING ZONE
+#******************************************************************************
+
+def main(repeats):
+    """
+    Testing.
+    """
+    from Inventory import Inventory
+    from SARS_rank_indep import simAnnealing1
+
+    param = (120, 0.12, 0.10, -0.8)
+    inventory_a = Inventory(50, 3, 5, 1, 32, 0, (50, 100))
+
+    result, report = profileRun(simAnnealing1, inventory_a, 10, 50, 0.5,
+                                repeats, 0, param)
+    print "\nBest objective function cost: ", result[0]
+    print "Best policy: ", result[1]
+    printReport(report)
+
+# uncomment next line to run a profiled annealing run.
+#main(100)
@@ -5,9 +5,14 @@ Last modified on .. Sat Nov 21 11:10:25 2015
 
 @author: Caleb Andrade
 """
-from gencorrdemand import genCorrDemand
+from gencorrdemand import genCorrDemandBlock
 from Inventory import Inventory
+from running_stats import RunningStats
+from h_constants import hConstant
+from first_stage import PILOT, firstStageSize
+from batchSimulation import batchRepSimulation, policyGridSimulation
 import time
+import numpy as np
 
 
 
@@ -19,6 +24,11 @@ def repSimulation(inventory, demands_list, repeats, index):
     Input: inventory, list of demands, repeats, index of inventory.
     Output: a list with average costs of every run.
     """
+    ## a fresh inventory runs every replication from its initial state,
+    ## so all of them can be advanced together by the batch engine
+    if inventory.getPeriods() == 0:
+        return batchRepSimulation(inventory, demands_list, repeats, index)
+    
     avg = []
     temp_inventory = inventory.clone()
     
@@ -38,7 +48,7 @@ def simultaneousRuns(inventory_a, inventory_b, repeats, param, joint = False):
     Output: average and variance for the simulations of each inventory.
     """
     # generate a list of demands
-    demands_list = [genCorrDemand(param[0], param[1], param[2], param[3]) for j in range(repeats)] 
+    demands_list = zip(*genCorrDemandBlock(repeats, param[0], param[1], param[2], param[3]))
     
     # repeat simulations and save average costs in a list for each inventory
     avg1 = repSimulation(inventory_a, demands_list, repeats, 0)
@@ -56,45 +66,17 @@ def simultaneousRuns(inventory_a, inventory_b, repeats, param, joint = False):
         
         return [average1, average2], [variance1, variance2]
  
-def setPrecision(beta):
+def setPrecision(beta, n0 = 20, k = 2):
     """
-    Look in TABLE the h value for given parameters.
+    Constant h of the two-stage procedure for given parameters, computed
+    once per (n0, k), cached on disk and interpolated in beta.
     
-    Input: precision, initial number of repeats, table of values.
+    Input: precision, initial number of repeats, number of systems.
     Output: h.
     """
-    # set for n0 = 20
-    if beta == 0.90:
-        return 1.89
-    
-    return binarySearch(beta)
-    
-def binarySearch(beta):
-    """
-    Return the h-value from H_TABLE that corresponds to beta.
-    """
-    lo, hi = 0, (len(H_TABLE)-1)
-    #print "length: ", hi
-    while lo < hi-1:
-        mid = (lo + hi) >> 1
-        #print "\ninterva: ", lo, hi
-        k = H_TABLE[mid][0]
-        if k == beta:
-            return H_TABLE[mid][1]
-        elif k < beta:
-            lo = mid # search upper subarray
-        else:
-            hi = mid # search lower subarray
+    return hConstant(beta, n0, k)
+
 
-    if lo < hi:
-        if abs(H_TABLE[lo][0]-beta) > abs(H_TABLE[hi][0]-beta):
-            return H_TABLE[hi][1]
-        else:
-            return H_TABLE[lo][1]
-    else:
-        return H_TABLE[lo][1]
-    
-    
 def weight(n0, ni, delta, variance, h):
     """
     Compute the weights for the averages used in ranking selection.
@@ -113,50 +95,89 @@ def statMeasures(values):
     Input: list of values.
     Output: variance.
     """
-    average = sum(values) / len(values)
-    variance = [(average - values[i])**2 for i in range(len(values))]
+    stats = RunningStats().extend(values)
     
-    return average, sum(variance) / (len(values) - 1)
+    return stats.meanX(), stats.variance()
     
 
-def rankSelect1(inventory_a, policy, param, delta, beta, index):
+def firstStage(groups, param, n0, delta, beta, precision = None):
+    """
+    Run the first stage of the two-stage procedure: n0 replications of every
+    inventory on common demands. Inventories come in groups, one per policy
+    compared, the cost of a group being the sum of its inventories' costs.
+    If n0 is None it is chosen adaptively: a pilot of PILOT replications
+    estimates the largest variance among groups, n0 is set by
+    firstStageSize and the pilot is completed up to n0 replications.
+    
+    Input: list of groups of (inventory, index) pairs, random demands
+    parameters, n0 (None for adaptive), delta, beta, target relative
+    precision (if given, delta is this fraction of the smallest mean).
+    Output: costs of every inventory, by group, n0 and delta.
+    """
+    size = n0 or PILOT
+    demands_list = zip(*genCorrDemandBlock(size, param[0], param[1], param[2], param[3]))
+    costs = [[repSimulation(system, demands_list, size, index)
+              for system, index in group] for group in groups]
+    
+    if n0 is None:
+        stats = [statMeasures(map(sum, zip(*group))) for group in costs]
+        if precision is not None:
+            delta = precision*min(abs(mean) for mean, variance in stats)
+        n0 = firstStageSize(max(variance for mean, variance in stats), delta, beta)
+        if n0 > size:
+            demands_list = zip(*genCorrDemandBlock(n0 - size, param[0], param[1], param[2], param[3]))
+            for i in range(len(groups)):
+                for j, (system, index) in enumerate(groups[i]):
+                    costs[i][j] += repSimulation(system, demands_list, n0 - size, index)
+    
+    if precision is not None:
+        delta = precision*min(abs(sum(map(sum, group))) / n0 for group in costs)
+    
+    return costs, n0, delta
+    
+
+def rankSelect1(inventory_a, policy, param, delta, beta, index, n0 = 20, precision = None,
+                report = None):
     """
     Compute sample mean of cost value for an inventory, two different policies,
     select the best policy using a ranking and selection statistical procedure.
     
     Input: inventory, policy to evaluate, random demands parameters,
     delta and beta are the precision parameters, index: (0, inventory_a),
-    (1, inventory_b).
+    (1, inventory_b). As an option, n0 is the first stage size (None
+    chooses it from a pilot, see firstStage), precision a target relative
+    precision and report a dictionary filled with n0 and the replications
+    spent on every policy.
     Output: best policy.
     """
-    # initialize n0, and create two inventory copies for simulation
-    n0 = 20
+    # create two inventory copies for simulation
     system_i = inventory_a.clone()
     system_j = inventory_a.clone()
     system_j.setPolicy(policy)
     
-    # generate a list of initial demands for n0 runs of simulation
-    demands_list = [genCorrDemand(param[0], param[1], param[2], param[3]) for j in range(n0)] 
-    
-    # run initial n0 simulations
-    avg1 = repSimulation(system_i, demands_list, n0, index) # use same index for comparison
-    avg2 = repSimulation(system_j, demands_list, n0, index)
+    # run initial n0 simulations on common demands
+    costs, n0, delta = firstStage([[(system_i, index)], [(system_j, index)]],
+                                  param, n0, delta, beta, precision)
+    avg1, avg2 = costs[0][0], costs[1][0] # use same index for comparison
     
     # get initial averages and variances for the two policies
     [mean1, variance1] = statMeasures(avg1)
     [mean2, variance2] = statMeasures(avg2)
     
     # calculate how many more simulations to run    
-    h = setPrecision(beta)
+    h = setPrecision(beta, n0)
     
     n1 = max(n0 + 1, 1 + int(variance1*(h**2) / delta**2))
     n2 = max(n0 + 1, 1 + int(variance2*(h**2) / delta**2))
     
     # generate additional simulations
-    demands_list = [genCorrDemand(param[0], param[1], param[2], param[3]) for j in range(max(n1, n2) - n0)] 
+    demands_list = zip(*genCorrDemandBlock(max(n1, n2) - n0, param[0], param[1], param[2], param[3]))
     
     avg1 = sum(repSimulation(system_i, demands_list, n1 - n0, index)) / (n1 - n0)
     avg2 = sum(repSimulation(system_j, demands_list, n2 - n0, index)) / (n2 - n0)
+    if report is not None:
+        report['n0'] = n0
+        report['replications'] = [n1, n2]
     
     # compute weights
     w1 = weight(n0, n1, delta, variance1, h)
@@ -168,17 +189,20 @@ def rankSelect1(inventory_a, policy, param, delta, beta, index):
     
     return [sample_mean1, sample_mean2], [inventory_a.getPolicy(), policy]
     
-def rankSelect2(inventory_a, inventory_b, policy_a, policy_b, param, delta, beta):
+def rankSelect2(inventory_a, inventory_b, policy_a, policy_b, param, delta, beta, n0 = 20,
+                precision = None, report = None):
     """
     Compute sample mean of cost value for an inventory, two different policies,
     select the best policy using a ranking and selection statistical procedure.
     
     Input: inventory, policy to evaluate, random demands parameters,
-    delta and beta are the precision parameters.    
+    delta and beta are the precision parameters. As an option, n0 is the
+    first stage size (None chooses it from a pilot, see firstStage),
+    precision a target relative precision and report a dictionary filled
+    with n0 and the replications spent on every pair of policies.
     Output: best policy.
     """
-    # initialize n0, and create two inventory copies for simulation
-    n0 = 20
+    # create two inventory copies for simulation
     system_ia = inventory_a.clone()
     system_ib = inventory_b.clone()    
     system_ja = inventory_a.clone()
@@ -187,14 +211,11 @@ def rankSelect2(inventory_a, inventory_b, policy_a, policy_b, param, delta, beta
     system_ja.setPolicy(policy_a)
     system_jb.setPolicy(policy_b)    
     
-    # generate a list of initial demands for n0 runs of simulation
-    demands_list = [genCorrDemand(param[0], param[1], param[2], param[3]) for j in range(n0)] 
-    
-    # run initial n0 simulations
-    avg1a = repSimulation(system_ia, demands_list, n0, 0) # use same index for comparison
-    avg1b = repSimulation(system_ib, demands_list, n0, 1) # use same index for comparison
-    avg2a = repSimulation(system_ja, demands_list, n0, 0)
-    avg2b = repSimulation(system_jb, demands_list, n0, 1)
+    # run initial n0 simulations on common demands
+    costs, n0, delta = firstStage([[(system_ia, 0), (system_ib, 1)],
+                                   [(system_ja, 0), (system_jb, 1)]],
+                                  param, n0, delta, beta, precision)
+    [avg1a, avg1b], [avg2a, avg2b] = costs
     
     avg1 = [avg1a[i] + avg1b[i] for i in range(len(avg1a))]  
     avg2 = [avg1a[i] + avg1b[i] for i in range(len(avg1a))] 
@@ -204,18 +225,21 @@ def rankSelect2(inventory_a, inventory_b, policy_a, policy_b, param, delta, beta
     [mean2, variance2] = statMeasures(avg2)
     
     # calculate how many more simulations to run    
-    h = setPrecision(beta)
+    h = setPrecision(beta, n0)
     
     n1 = max(n0 + 1, 1 + int(variance1*(h**2) / delta**2))
     n2 = max(n0 + 1, 1 + int(variance2*(h**2) / delta**2))
     
     # generate additional simulations
-    demands_list = [genCorrDemand(param[0], param[1], param[2], param[3]) for j in range(max(n1,n2) - n0)] 
+    demands_list = zip(*genCorrDemandBlock(max(n1,n2) - n0, param[0], param[1], param[2], param[3]))
     
     avg1a = sum(repSimulation(system_ia, demands_list, n1 - n0, 0)) / (n1 - n0)
     avg1b = sum(repSimulation(system_ib, demands_list, n1 - n0, 1)) / (n1 - n0)
     avg2a = sum(repSimulation(system_ja, demands_list, n2 - n0, 0)) / (n2 - n0)
     avg2b = sum(repSimulation(system_jb, demands_list, n2 - n0, 1)) / (n2 - n0)
+    if report is not None:
+        report['n0'] = n0
+        report['replications'] = [n1, n2]
     
     # compute weights
     w1 = weight(n0, n1, delta, variance1, h)
@@ -229,6 +253,81 @@ def rankSelect2(inventory_a, inventory_b, policy_a, policy_b, param, delta, beta
     return [sample_mean1, sample_mean2],[inventory_a.getPolicy(),inventory_b.getPolicy(),policy_a,policy_b]
 
 
+def screen(means, S2, alive, h2, delta, r):
+    """
+    Screening step of the fully sequential procedure: keep the policies
+    whose mean cost is not clearly worse than any other surviving policy.
+    
+    Input: mean costs after r replications, variances of the pairwise
+    differences, mask of surviving policies, h^2, delta, r.
+    Output: mask of surviving policies.
+    """
+    idx = np.flatnonzero(alive)
+    W = np.maximum(0, (delta / (2.0*r))*(h2*S2[np.ix_(idx, idx)] / delta**2 - r))
+    keep = (means[idx][:, None] <= means[idx][None, :] + W).all(axis=1)
+    alive = np.zeros(len(alive), dtype=bool)
+    alive[idx[keep]] = True
+    
+    return alive
+    
+
+def sequentialSelect(inventory_a, policies, param, delta, beta, index, step = 10, max_reps = 10000):
+    """
+    Select the best of many policies with a fully sequential ranking and
+    selection procedure (Kim and Nelson). All policies are simulated on
+    common random numbers: n0 replications first, then 'step' replications
+    per round for the policies still in contention only, eliminating a
+    policy as soon as its cost is clearly worse than another's.
+    
+    Input: inventory, list of policies to compare, random demands parameters,
+    delta and beta are the precision parameters, index: (0, inventory_a),
+    (1, inventory_b), replications per round, maximum replications.
+    Output: best policy, its sample mean, list of replications spent on
+    every policy.
+    """
+    n0 = 20
+    k = len(policies)
+    
+    # run initial n0 simulations of every policy
+    demands = genCorrDemandBlock(n0, param[0], param[1], param[2], param[3])[index]
+    costs = policyGridSimulation(inventory_a, policies, demands)
+    sums = costs.sum(axis=1)
+    reps = np.zeros(k, dtype=int) + n0
+    if k == 1:
+        return tuple(policies[0]), sums[0] / n0, reps.tolist()
+    
+    # variances of the pairwise differences, and the constant h^2
+    C = np.cov(costs)
+    S2 = np.diag(C)[:, None] + np.diag(C)[None, :] - 2*C
+    eta = 0.5*((2*(1 - beta) / (k - 1))**(-2.0 / (n0 - 1)) - 1)
+    h2 = 2*eta*(n0 - 1)
+    
+    r = n0
+    alive = screen(sums / r, S2, np.ones(k, dtype=bool), h2, delta, r)
+    while alive.sum() > 1 and r < max_reps:
+        # no pair of survivors needs more replications to be told apart
+        idx = np.flatnonzero(alive)
+        if r > (h2*S2[np.ix_(idx, idx)] / delta**2).max():
+            break
+        # simulate one more round of the surviving policies
+        demands = genCorrDemandBlock(step, param[0], param[1], param[2], param[3])[index]
+        costs = policyGridSimulation(inventory_a, [policies[i] for i in idx], demands)
+        for rep in range(step):
+            sums[idx] += costs[:, rep]
+            reps[idx] += 1
+            r += 1
+            alive = screen(sums / r, S2, alive, h2, delta, r)
+            idx_alive = alive[idx]
+            idx, costs = idx[idx_alive], costs[idx_alive]
+            if len(idx) == 1:
+                break
+    
+    means = sums / reps
+    best = np.flatnonzero(alive)[means[alive].argmin()]
+    
+    return tuple(policies[best]), means[best], reps.tolist()
+
+
 #******************************************************************************
 # TESTING ZONE
 #******************************************************************************
@@ -268,27 +367,18 @@ def main():
     print "sample means and policies: ", result4
     print "Running time: ", toc - tic
     
+    print "\n******************* TESTING sequentialSelect ************************"
+    policies = [(low, top) for low in range(0, 60, 5) for top in range(40, 140, 10) if low < top]
+    tic = time.clock()
+    result6 = sequentialSelect(inventory_a, policies, param, 1, 0.90, 0)
+    toc = time.clock()
+    print "best policy and sample mean: ", result6[:2]
+    print "candidates, total replications: ", len(policies), sum(result6[2])
+    print "Running time: ", toc - tic
+    
     print "\n********************** TESTING rankSelect2 **************************"
     tic = time.clock()
     result5 = rankSelect2(inventory_a, inventory_b, (10, 40), (20, 60), param, 1, 0.90)
     toc = time.clock()
     print "sample means and policies: ", result5
     print "Running time: ", toc - tic
-
-H_TABLE =[[0.5272, 0.1], [0.5544, 0.2], [0.5812, 0.3], [0.6077, 0.4],
-          [0.6337, 0.5], [0.6591, 0.6], [0.6837, 0.7], [0.7075, 0.8], [0.7304, 0.9],
-          [0.7523, 1.0], [0.7732, 1.1], [0.793, 1.2], [0.8117, 1.3], [0.8293, 1.4],
-          [0.8457, 1.5], [0.8611, 1.6], [0.8753, 1.7], [0.8884, 1.8], [0.9004, 1.9],
-          [0.9115, 2.0], [0.9215, 2.1], [0.9307, 2.2], [0.9389, 2.3], [0.9464, 2.4],
-          [0.953, 2.5], [0.959, 2.6], [0.9643, 2.7], [0.969, 2.8], [0.9732, 2.9],
-          [0.9768, 3.0], [0.98, 3.1], [0.9828, 3.2], [0.9853, 3.3], [0.9874, 3.4],
-          [0.9893, 3.5], [0.9909, 3.6], [0.9923, 3.7], [0.9934, 3.8], [0.9944, 3.9],
-          [0.9953, 4.0], [0.996, 4.1], [0.9967, 4.2], [0.9972, 4.3], [0.9976, 4.4],
-          [0.998, 4.5], [0.9983, 4.6], [0.9986, 4.7], [0.9988, 4.8], [0.999, 4.9],
-          [0.9992, 5.0], [0.9993, 5.1]]
-
-
-
-    
-    
-    
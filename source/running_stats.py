@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 18:32:06 2026
+
+@author: Caleb Andrade
+"""
+
+#******************************************************************************
+# RunningStats CLASS
+#******************************************************************************
+
+class RunningStats(object):
+    """
+    Incremental statistics of the average costs of replications: count,
+    mean, variance and, for pairs of costs of two inventories simulated on
+    the same demands, their covariance. Replications are added one at a time
+    with Welford's update, so replications can be added to an existing
+    estimate without going over the previous ones, and no list of values or
+    squared deviations is ever kept.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total_x = 0 ## sum of costs, the mean is total / count
+        self.total_y = 0 ## sum of second costs, for covariance
+        self.m2_x = 0.0 ## sum of squared deviations from the mean
+        self.m2_y = 0.0
+        self.c2 = 0.0 ## sum of cross deviations
+
+    def update(self, x, y = None):
+        """
+        Add the cost of one replication, or the costs of both inventories.
+        """
+        delta_x = x - self.meanX()
+        delta_y = 0.0 if y is None else y - self.meanY()
+        self.count += 1
+        self.total_x += x
+        self.m2_x += delta_x*(x - self.meanX())
+        if y is not None:
+            self.total_y += y
+            self.m2_y += delta_y*(y - self.meanY())
+            self.c2 += delta_x*(y - self.meanY())
+
+    def extend(self, xs, ys = None):
+        """
+        Add the costs of many replications.
+        """
+        for i in range(len(xs)):
+            if ys is None:
+                self.update(xs[i])
+            else:
+                self.update(xs[i], ys[i])
+        return self
+
+    def meanX(self):
+        """
+        Mean of the costs, zero if empty.
+        """
+        if self.count == 0:
+            return 0.0
+        return self.total_x / float(self.count)
+
+    def meanY(self):
+        """
+        Mean of the second costs, zero if empty.
+        """
+        if self.count == 0:
+            return 0.0
+        return self.total_y / float(self.count)
+
+    def variance(self):
+        """
+        Sample variance of the costs.
+        """
+        return self.m2_x / (self.count - 1)
+
+    def varianceY(self):
+        """
+        Sample variance of the second costs.
+        """
+        return self.m2_y / (self.count - 1)
+
+    def covariance(self):
+        """
+        Sample covariance between the costs of the two inventories.
+        """
+        return self.c2 / (self.count - 1)
+
+    def sumVariance(self):
+        """
+        Sample variance of the joint cost, the sum of both inventories' costs.
+        """
+        return (self.m2_x + self.m2_y + 2*self.c2) / (self.count - 1)
+
+    def __str__(self):
+        """
+        Statistics as string.
+        """
+        info = '\nReplications............... ' + str(self.count) + '\n'
+        info += 'Mean....................... ' + str(self.meanX()) + '\n'
+        if self.count > 1:
+            info += 'Variance................... ' + str(self.variance()) + '\n'
+
+        return info
+
+
+#******************************************************************************
+# TESTING ZONE
+#******************************************************************************
+
+def main(n = 1000):
+    """
+    Testing: statistics accumulated in two halves, as a second stage adds
+    replications to a first one, against a single pass and against numpy.
+    """
+    import numpy as np
+
+    prng = np.random.RandomState(0)
+    xs = prng.exponential(80, n).tolist()
+    ys = (np.array(xs)*0.5 + prng.normal(0, 10, n)).tolist()
+
+    single = RunningStats().extend(xs, ys)
+    halves = RunningStats().extend(xs[:n // 2], ys[:n // 2])
+    halves.extend(xs[n // 2:], ys[n // 2:])
+    same = (single.count, single.meanX(), single.variance(), single.covariance()) == \
+           (halves.count, halves.meanX(), halves.variance(), halves.covariance())
+    if not same:
+        raise AssertionError("two halves differ from a single pass")
+    reference = np.cov(xs, ys)
+    for value, expected in ((single.variance(), reference[0, 0]),
+                            (single.varianceY(), reference[1, 1]),
+                            (single.covariance(), reference[0, 1])):
+        if abs(value - expected) > 1e-9*abs(expected):
+            raise AssertionError("%s differs from numpy's %s" % (value, expected))
+    print single
+    print "Two halves identical to a single pass, and to numpy: ", same
+
+# uncomment next line to check the accumulator.
+#main()
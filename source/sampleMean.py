@@ -4,11 +4,22 @@ Last modified on .. Sat Nov 21 11:10:25 2015
 
 @author: Caleb Andrade
 """
-from gencorrdemand import genCorrDemand as gcd
+from gencorrdemand import genCorrDemandBlock as gcdb
 from Inventory import Inventory
+from running_stats import RunningStats
+from h_constants import hConstant, hValue
+from first_stage import PILOT, firstStageSize
+from seed_streams import SeedSource
+from batchSimulation import batchRepSimulation
+from demand_cache import DemandCache
+from policy_cache import PolicyCache
 import time
 import numpy as np
 
+## demands generated from the same seeds are reused across calls, as the
+## annealing loop evaluates every candidate policy on a common seed list
+DEMAND_CACHE = DemandCache()
+
 
 def repSimulation(inventory, demands_list, repeats, index):
     """
@@ -18,6 +29,11 @@ def repSimulation(inventory, demands_list, repeats, index):
     Input: inventory, list of demands, repeats, index of inventory.
     Output: a list with average costs of every run.
     """
+    ## a fresh inventory runs every replication from its initial state,
+    ## so all of them can be advanced together by the batch engine
+    if inventory.getPeriods() == 0:
+        return batchRepSimulation(inventory, demands_list, repeats, index)
+    
     avg = []
     temp_inventory = inventory.clone()
     
@@ -29,6 +45,11 @@ def repSimulation(inventory, demands_list, repeats, index):
     return avg
 
 
+## replication costs of every policy scored on a seed list are memoized, so
+## policies revisited by the annealing chain are not simulated again
+POLICY_CACHE = PolicyCache(DEMAND_CACHE, repSimulation)
+
+
 def simultaneousRuns(inventory_a, inventory_b, repeats, param, joint = False):
     """
     Run simulation 'repeats' times simultaneously for two inventories.
@@ -38,7 +59,7 @@ def simultaneousRuns(inventory_a, inventory_b, repeats, param, joint = False):
     Output: average and variance for the simulations of each inventory.
     """
     # generate a list of demands
-    demands_list = [gcd(param[0], param[1], param[2], param[3]) for j in range(repeats)] 
+    demands_list = zip(*gcdb(repeats, param[0], param[1], param[2], param[3]))
     
     # repeat simulations and save average costs in a list for each inventory
     avg1 = repSimulation(inventory_a, demands_list, repeats, 0)
@@ -57,59 +78,32 @@ def simultaneousRuns(inventory_a, inventory_b, repeats, param, joint = False):
         return [average1, average2], [variance1, variance2]
  
 
-def setPrecision(beta):
+def setPrecision(beta, n0 = 20, k = 2):
     """
-    Look in TABLE the h value for given parameters.
+    Constant h of the two-stage procedure for given parameters, computed
+    once per (n0, k), cached on disk and interpolated in beta.
     
-    Input: precision, initial number of repeats, table of values.
+    Input: precision, initial number of repeats, number of systems.
     Output: h.
     """
-    # set for n0 = 20
-    if beta == 0.90:
-        return 1.9
-    
-    return binarySearch(beta)
-    
+    return hConstant(beta, n0, k)
+
+
+## source of the seeds, rooted at a seed drawn from the OS; seed it to
+## reproduce a run, its state is saved in the annealing checkpoints
+SEED_SOURCE = SeedSource()
+
 
 def genSeeds(n):
     """
-    Generate a set of n seeds for random number generation.
+    Generate a set of n seeds for random number generation, compact seeds
+    (root, index) taken from SEED_SOURCE.
     
     Input: number of seeds.
     Output: list of seeds.
     """
-    seeds = []
-    for i in range(n):
-        prng = np.random.RandomState()
-        seeds.append(prng.get_state())
-    
-    return seeds
-
-    
-def binarySearch(beta):
-    """
-    Return the h-value from H_TABLE that corresponds to beta.
-    @author: Caiwei Li
-    """
-    lo, hi = 0, (len(H_TABLE)-1)
-    while lo < hi-1:
-        mid = (lo + hi) >> 1
-        k = H_TABLE[mid][0]
-        if k == beta:
-            return H_TABLE[mid][1]
-        elif k < beta:
-            lo = mid # search upper subarray
-        else:
-            hi = mid # search lower subarray
+    return SEED_SOURCE.take(n)
 
-    if lo < hi:
-        if abs(H_TABLE[lo][0]-beta) > abs(H_TABLE[hi][0]-beta):
-            return H_TABLE[hi][1]
-        else:
-            return H_TABLE[lo][1]
-    else:
-        return H_TABLE[lo][1]
-    
     
 def weight(n0, ni, delta, variance, h):
     """
@@ -130,13 +124,120 @@ def statMeasures(values):
     Input: list of values.
     Output: variance.
     """
-    average = sum(values) / len(values)
-    variance = [(average - values[i])**2 for i in range(len(values))]
+    stats = RunningStats().extend(values)
+    
+    return stats.meanX(), stats.variance()
+    
+
+def meanDemands(systems, param, seeds, antithetic = False):
+    """
+    Realized mean demand of every replication, the control variates.
+    
+    Input: list of (inventory, index) pairs, random demands' parameters,
+    seeds, average with the antithetic demand paths?
+    Output: (replications x inventories) array of mean demands.
+    """
+    demands_list = DEMAND_CACHE(seeds, param[0], param[1], param[2], param[3])
+    means = np.array([[demands[index].mean() for system, index in systems]
+                      for demands in demands_list])
+    if antithetic:
+        demands_list = DEMAND_CACHE(seeds, param[0], param[1], param[2],
+                                    param[3], True)
+        means += np.array([[demands[index].mean() for system, index in systems]
+                           for demands in demands_list])
+        means /= 2
+    
+    return means
+    
+
+def sumCosts(systems, param, seeds, repeats, pool = None, antithetic = False):
+    """
+    Cost of every replication summed over a list of (inventory, index) pairs,
+    reusing memoized runs.
+    """
+    system, index = systems[0]
+    costs = POLICY_CACHE.costs(system, param, index, seeds, repeats, pool, antithetic)
+    for system, index in systems[1:]:
+        more = POLICY_CACHE.costs(system, param, index, seeds, repeats, pool, antithetic)
+        costs = [costs[i] + more[i] for i in range(repeats)]
+    
+    return costs
+    
+
+def reducedCosts(systems, param, seeds, repeats, pool = None, reduction = None, coef = None):
+    """
+    Cost of the first 'repeats' replications summed over a list of
+    (inventory, index) pairs, with an optional variance reduction technique.
+    'antithetic' averages every replication with the replication on the
+    antithetic demand paths of its seed; 'control' uses the realized mean
+    demand, whose expected value is 1/lambda, as control variate; 'both'
+    applies the two.
+    
+    Input: list of (inventory, index) pairs, random demands' parameters,
+    seeds, replications, pool, reduction, coefficients of the control
+    variates (None fits them on these replications).
+    Output: costs for the estimator, plain costs, control coefficients.
+    """
+    antithetic = reduction in ('antithetic', 'both')
+    costs = plain = sumCosts(systems, param, seeds, repeats, pool)
+    if antithetic:
+        anti = sumCosts(systems, param, seeds, repeats, pool, True)
+        costs = [(plain[i] + anti[i]) / 2 for i in range(repeats)]
+    
+    if reduction in ('control', 'both'):
+        controls = meanDemands(systems, param, seeds[:repeats], antithetic)
+        controls -= [1.0 / param[1 + index] for system, index in systems]
+        costs = np.array(costs)
+        if coef is None:
+            ## least squares fit of the costs on the centered controls
+            centered = controls - controls.mean(axis=0)
+            coef = np.linalg.lstsq(centered, costs - costs.mean(), rcond=None)[0]
+        costs = (costs - np.dot(controls, coef)).tolist()
+    
+    return costs, plain, coef
+    
+
+def reductionReport(report, costs, plain, reduction, n1):
+    """
+    Fill the dictionary 'report' with the first stage variance of the
+    estimator's costs, the variance of plain replications for the same
+    number of simulations, their ratio (the achieved variance reduction),
+    and the replications and simulations spent.
+    """
+    simulations = 2 if reduction in ('antithetic', 'both') else 1
+    variance = statMeasures(costs)[1]
+    plain_variance = statMeasures(plain)[1] / simulations
+    report['variance'] = variance
+    report['plain_variance'] = plain_variance
+    report['reduction'] = plain_variance / variance
+    report['replications'] = n1
+    report['simulations'] = simulations*n1
     
-    return average, sum(variance) / (len(values) - 1)
+
+def pilotStage(systems, param, delta, beta, seeds, pool = None, reduction = None,
+               precision = None):
+    """
+    Pilot of the adaptive mode: PILOT replications estimate the variance of
+    the costs, which sets the first stage size. The pilot replications are
+    the first ones of the first stage, so none is wasted.
+    
+    Input: list of (inventory, index) pairs, random demands' parameters,
+    delta, beta, seeds, pool, reduction, relative precision (if given, delta
+    is this fraction of the pilot mean).
+    Output: first stage size n0, delta.
+    """
+    if len(seeds) < PILOT:
+        seeds += genSeeds(PILOT - len(seeds))
+    costs = reducedCosts(systems, param, seeds, PILOT, pool, reduction)[0]
+    mean, variance = statMeasures(costs)
+    if precision is not None:
+        delta = precision*abs(mean)
+    
+    return firstStageSize(variance, delta, beta), delta
     
 
-def sampleMean1(inventory_a, param, delta, beta, index, rank, seeds = []):
+def sampleMean1(inventory_a, param, delta, beta, index, rank, seeds = [], pool = None,
+                reduction = None, report = None, n0 = 20, precision = None):
     """
     Compute sample mean of cost value for an inventory as a weighted average
     of averages, following the statistical method for ranking and selection.
@@ -144,21 +245,39 @@ def sampleMean1(inventory_a, param, delta, beta, index, rank, seeds = []):
     Input: inventory, random demands' parameters, delta and beta are the 
     precision parameteres, index: (0, inventory_a) and (1, inventory_b).
     Rank is a boolean variable to activate or deactivate ranking and selection.
-    As an option, seeds is a list of seeds for random number generation.
+    As an option, seeds is a list of seeds for random number generation,
+    pool is a ReplicationPool to run the replications in parallel,
+    reduction is a variance reduction technique (see reducedCosts),
+    report a dictionary filled with the variance reduction achieved and the
+    replications spent, n0 the first stage size (None chooses it from a
+    pilot, see pilotStage) and precision a target relative precision, which
+    replaces delta by this fraction of the first stage mean.
     Output: sample mean of current inventory.
     """
-    n0 = 20
     system_a = inventory_a.clone()
+    systems = [(system_a, index)]
     ## if no seeds are specified, generate seeds    
     if seeds == []:
         no_seeds = True # no seeds were specified
-        seeds = genSeeds(n0)
+        seeds = genSeeds(n0 or PILOT)
     else:
         no_seeds = False
+    
+    ## adaptive mode, choose n0 from the variance of a pilot
+    if n0 is None:
+        n0, delta = pilotStage(systems, param, delta, beta, seeds, pool, reduction,
+                               precision)
+    if len(seeds) < n0: ## if seeds were specified but are not enough
+        seeds += genSeeds(n0 - len(seeds))
    
-    ## generate a list of initial demands. Compute average and variance for n0 replications.
-    demands_list = [gcd(param[0], param[1], param[2], param[3], seed=seeds[j]) for j in range(n0)] 
-    avg1, variance = statMeasures(repSimulation(system_a, demands_list, n0, index))
+    ## compute average and variance for n0 replications, reusing memoized runs
+    costs, plain, coef = reducedCosts(systems, param, seeds, n0, pool, reduction)
+    avg1, variance = statMeasures(costs)
+    if precision is not None:
+        delta = precision*abs(avg1)
+    if report is not None:
+        reductionReport(report, costs, plain, reduction, n0)
+        report['n0'] = n0
     
     ## if no ranking and selection
     if not rank:
@@ -166,7 +285,7 @@ def sampleMean1(inventory_a, param, delta, beta, index, rank, seeds = []):
         return avg1, seeds
     
     ## calculate how many more simulations to run    
-    h = setPrecision(beta)
+    h = setPrecision(beta, n0)
     n1 = max(n0 + 1, 1 + int(variance*(h**2) / delta**2))
     
     ## generate additional batch of seeds
@@ -178,10 +297,11 @@ def sampleMean1(inventory_a, param, delta, beta, index, rank, seeds = []):
         more_seeds = []
     seeds += more_seeds
     
-    # generate additional demands. Compute average for n1 - n0 replications
-    demands_list = [gcd(param[0], param[1], param[2], param[3], seed=seeds[n0 + j]) for j in range(n1 - n0)] 
-    
-    avg2 = sum(repSimulation(system_a, demands_list, n1 - n0, index)) / (n1 - n0)
+    # compute average for n1 - n0 additional replications
+    costs, plain, coef = reducedCosts(systems, param, seeds, n1, pool, reduction, coef)
+    avg2 = sum(costs[n0:]) / (n1 - n0)
+    if report is not None:
+        reductionReport(report, costs[:n0], plain[:n0], reduction, n1)
     
     # compute weights and weighted average of sample mean
     w = weight(n0, n1, delta, variance, h)
@@ -190,7 +310,8 @@ def sampleMean1(inventory_a, param, delta, beta, index, rank, seeds = []):
     return sample_mean, seeds
     
 
-def sampleMean2(inventory_a, inventory_b, param, delta, beta, rank, seeds = []):
+def sampleMean2(inventory_a, inventory_b, param, delta, beta, rank, seeds = [], pool = None,
+                reduction = None, report = None, n0 = 20, precision = None):
     """
     Compute sample mean of cost value for the sum of two inventories as a
     weighted average, following the statistical method for ranking and selection.
@@ -198,27 +319,41 @@ def sampleMean2(inventory_a, inventory_b, param, delta, beta, rank, seeds = []):
     Input: inventories, random demands' parameters, delta and beta are the 
     precision parameters, index: (0, inventory_a) and (1, inventory_b).
     Rank is a boolean variable to activate or deactivate ranking and selection.
-    As an option, seeds is a list of seeds for random number generation.
+    As an option, seeds is a list of seeds for random number generation,
+    pool is a ReplicationPool to run the replications in parallel,
+    reduction is a variance reduction technique (see reducedCosts),
+    report a dictionary filled with the variance reduction achieved and the
+    replications spent, n0 the first stage size (None chooses it from a
+    pilot, see pilotStage) and precision a target relative precision, which
+    replaces delta by this fraction of the first stage mean.
     Output: sample mean of current inventory.
     """
-    n0 = 20
     system_a = inventory_a.clone()
     system_b = inventory_b.clone()
+    systems = [(system_a, 0), (system_b, 1)]
     
     ## if no seeds are specified, generate seeds    
     if seeds == []:
         no_seeds = True # no seeds were specified
-        seeds = genSeeds(n0)
+        seeds = genSeeds(n0 or PILOT)
     else:
         no_seeds = False
-   
-    ## generate a list of initial demands. Compute average and variance for n0 replications.
-    demands_list = [gcd(param[0], param[1], param[2], param[3], seed=seeds[j]) for j in range(n0)] 
-    avg1a = repSimulation(system_a, demands_list, n0, 0) 
-    avg1b = repSimulation(system_b, demands_list, n0, 1)         
     
-    avg1 = [avg1a[i] + avg1b[i] for i in range(len(avg1a))]  
+    ## adaptive mode, choose n0 from the variance of a pilot
+    if n0 is None:
+        n0, delta = pilotStage(systems, param, delta, beta, seeds, pool, reduction,
+                               precision)
+    if len(seeds) < n0: ## if seeds were specified but are not enough
+        seeds += genSeeds(n0 - len(seeds))
+   
+    ## compute average and variance for n0 replications, reusing memoized runs
+    avg1, plain, coef = reducedCosts(systems, param, seeds, n0, pool, reduction)
     mean1, variance = statMeasures(avg1)
+    if precision is not None:
+        delta = precision*abs(mean1)
+    if report is not None:
+        reductionReport(report, avg1, plain, reduction, n0)
+        report['n0'] = n0
     
     ## if no ranking and selection
     if not rank:
@@ -226,7 +361,7 @@ def sampleMean2(inventory_a, inventory_b, param, delta, beta, rank, seeds = []):
         return mean1, seeds
         
     ## calculate how many more simulations to run    
-    h = setPrecision(beta)
+    h = setPrecision(beta, n0)
     n1 = max(n0 + 1, 1 + int(variance*(h**2) / delta**2))
    
     ## generate additional batch of seeds
@@ -238,14 +373,12 @@ def sampleMean2(inventory_a, inventory_b, param, delta, beta, rank, seeds = []):
         more_seeds = []
     seeds += more_seeds
     
-    # generate additional demands. Compute average for n1 - n0 replications
-    demands_list = [gcd(param[0], param[1], param[2], param[3], seed=seeds[n0 + j]) for j in range(n1 - n0)] 
-    
-    avg2a = repSimulation(system_a, demands_list, n1 - n0, 0) 
-    avg2b = repSimulation(system_b, demands_list, n1 - n0, 1)         
-    
-    avg2 = [avg2a[i] + avg2b[i] for i in range(len(avg2a))]  
+    # compute average for n1 - n0 additional replications
+    costs, plain, coef = reducedCosts(systems, param, seeds, n1, pool, reduction, coef)
+    avg2 = costs[n0:]
     mean2 = sum(avg2) / len(avg2)
+    if report is not None:
+        reductionReport(report, costs[:n0], plain[:n0], reduction, n1)
     
     # compute weights and weighted average of sample mean
     w = weight(n0, n1, delta, variance, h)
@@ -254,18 +387,6 @@ def sampleMean2(inventory_a, inventory_b, param, delta, beta, rank, seeds = []):
     return sample_mean, seeds
     
 
-H_TABLE =[[0.5272, 0.1], [0.5544, 0.2], [0.5812, 0.3], [0.6077, 0.4],
-          [0.6337, 0.5], [0.6591, 0.6], [0.6837, 0.7], [0.7075, 0.8], [0.7304, 0.9],
-          [0.7523, 1.0], [0.7732, 1.1], [0.793, 1.2], [0.8117, 1.3], [0.8293, 1.4],
-          [0.8457, 1.5], [0.8611, 1.6], [0.8753, 1.7], [0.8884, 1.8], [0.9004, 1.9],
-          [0.9115, 2.0], [0.9215, 2.1], [0.9307, 2.2], [0.9389, 2.3], [0.9464, 2.4],
-          [0.953, 2.5], [0.959, 2.6], [0.9643, 2.7], [0.969, 2.8], [0.9732, 2.9],
-          [0.9768, 3.0], [0.98, 3.1], [0.9828, 3.2], [0.9853, 3.3], [0.9874, 3.4],
-          [0.9893, 3.5], [0.9909, 3.6], [0.9923, 3.7], [0.9934, 3.8], [0.9944, 3.9],
-          [0.9953, 4.0], [0.996, 4.1], [0.9967, 4.2], [0.9972, 4.3], [0.9976, 4.4],
-          [0.998, 4.5], [0.9983, 4.6], [0.9986, 4.7], [0.9988, 4.8], [0.999, 4.9],
-          [0.9992, 5.0], [0.9993, 5.1]]
-          
 #******************************************************************************
 # TESTING ZONE
 #******************************************************************************
@@ -294,14 +415,14 @@ def main():
 #    
     print "\n********************** TESTING sampleMean1 **************************"
     tic = time.clock()
-    result3 = sampleMean1(inventory_a, param, 1, 0.90, 0)
+    result3 = sampleMean1(inventory_a, param, 1, 0.90, 0, True)
     toc = time.clock()
     print "\nSample mean: ", result3[0]
     print "Number of seeds: ", len(result3[1])
     print "Running time: ", toc - tic
     
     tic = time.clock()
-    result4 = sampleMean1(inventory_b, param, 1, 0.90, 1)
+    result4 = sampleMean1(inventory_b, param, 1, 0.90, 1, True)
     toc = time.clock()
     print "\nSample mean: ", result4[0]
     print "Number of seeds: ", len(result4[1])
@@ -309,24 +430,27 @@ def main():
     
     print "\n********************** TESTING sampleMean2 **************************"
     tic = time.clock()
-    result5 = sampleMean2(inventory_a, inventory_b, param, 1, 0.90)
+    result5 = sampleMean2(inventory_a, inventory_b, param, 1, 0.90, True)
     toc = time.clock()
     print "Sample mean: ", result5[0]
     print "Number of seeds: ", len(result5[1])
     print "Running time: ", toc - tic
     
     tic = time.clock()
-    result6 = sampleMean2(inventory_a, inventory_b, param, 1, 0.90, result5[1])
+    result6 = sampleMean2(inventory_a, inventory_b, param, 1, 0.90, True, result5[1])
     toc = time.clock()
     print "\nSample mean: ", result6[0]
     print "Number of seeds: ", len(result6[1])
     print "Running time: ", toc - tic
     
-
-
-
-
-
-    
-    
-    
+    print "\n****************** TESTING adaptive first stage *********************"
+    report = {}
+    tic = time.clock()
+    result7 = sampleMean1(inventory_a, param, 1, 0.90, 0, True, [], None, None, report, None)
+    toc = time.clock()
+    print "\nSample mean: ", result7[0]
+    print "First stage size: ", report['n0']
+    print "Replications spent: ", report['replications']
+    print "h of the first stage, table and solved: ", setPrecision(0.90, report['n0']), \
+        hValue(0.90, report['n0'])
+    print "Running time: ", toc - tic
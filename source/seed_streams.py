@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Mon Oct 19 08:05:33 2026
+
+@author: Caleb Andrade
+
+Compact seeds for common random numbers. A seed is a short tuple of
+non-negative integers, a root seed followed by a replication index, e.g.
+(root, 17); the prng of a replication is initialized from the tuple, so any
+replication's demands are regenerated from two integers instead of a full
+MT19937 state of 624 words. Streams are spawned by appending an index to
+the root: the seeds of the stream (root, 3) are (root, 3, 0), (root, 3, 1),
+and so on, independent of the seeds of the root and of its other streams.
+
+Full prng state tuples, as returned by RandomState().get_state(), are still
+accepted wherever a seed is.
+"""
+import os
+import struct
+import numpy as np
+
+
+def newRoot():
+    """
+    Random root seed of 63 bits drawn from the OS.
+    """
+    return struct.unpack('<Q', os.urandom(8))[0] >> 1
+
+
+def isStateTuple(seed):
+    """
+    Is the seed a full prng state tuple rather than a compact seed?
+    """
+    return isinstance(seed[0], str)
+
+
+def seedKey(seed):
+    """
+    Key of a compact seed for the prng initialization: every integer of the
+    tuple as two 32 bit words, so different tuples give different keys.
+    """
+    key = []
+    for value in seed:
+        value = int(value)
+        key += [value & 0xffffffff, (value >> 32) & 0xffffffff]
+
+    return np.array(key, dtype = np.uint32)
+
+
+def setSeed(prng, seed):
+    """
+    Initialize a RandomState from a compact seed or a full state tuple.
+    """
+    if isStateTuple(seed):
+        prng.set_state(seed)
+    else:
+        prng.seed(seedKey(seed))
+
+    return prng
+
+
+#******************************************************************************
+# SeedSource CLASS
+#******************************************************************************
+
+class SeedSource(object):
+    """
+    Source of compact seeds: the seeds (root, 0), (root, 1), ... are handed
+    out in order. Its state is the root and the number of seeds handed out,
+    so a run seeded from one integer can be reproduced or resumed.
+    """
+    def __init__(self, root = None):
+        """
+        root : integer or tuple of integers, drawn from the OS if None
+        """
+        self.seed(root)
+
+    def seed(self, root = None):
+        """
+        Restart the source from a new root.
+        """
+        if root is None:
+            root = newRoot()
+        if not isinstance(root, tuple):
+            root = (int(root),)
+        self.root = root
+        self.count = 0
+
+    def take(self, n):
+        """
+        Next n seeds of the source.
+        """
+        seeds = [self.root + (i,) for i in range(self.count, self.count + n)]
+        self.count += n
+
+        return seeds
+
+    def spawn(self, i):
+        """
+        Independent source number i of this source.
+        """
+        return SeedSource(self.root + (i,))
+
+    def getState(self):
+        """
+        State of the source, to restore it with setState.
+        """
+        return self.root, self.count
+
+    def setState(self, state):
+        """
+        Restore a state saved with getState.
+        """
+        self.root, self.count = state
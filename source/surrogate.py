@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on ........ Sun Oct 18 20:51:14 2026
+
+@author: Caleb Andrade
+"""
+from math import exp, sqrt
+import numpy as np
+
+#******************************************************************************
+# Surrogate CLASS
+#******************************************************************************
+
+class Surrogate(object):
+    """
+    Quadratic regression of the sample mean cost on the policy, fitted online
+    to the policies already simulated in an annealing run. A proposal is
+    scored with a dot product, and only proposals that could be accepted
+    are sent to the full simulation: a proposal is screened out when, even
+    with its predicted cost lowered by the model's error, it would be
+    accepted with probability below 'threshold'. Every simulated proposal is
+    first predicted, so the error reported is measured out of sample.
+    """
+    def __init__(self, threshold = 0.01, min_samples = None, scale = 100.0):
+        """
+        threshold : smallest acceptance probability worth a simulation
+        min_samples : simulated policies needed before screening, defaults
+        to twice the number of regression coefficients
+        scale : policies are divided by it, to keep the fit well conditioned
+        """
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.scale = scale
+        self.xtx = None ## normal equations, accumulated
+        self.xty = None
+        self.coef = None
+        self.samples = 0
+        self.screened = 0 ## proposals rejected without simulation
+        self.errors = 0 ## predictions checked against a simulation
+        self.sum_error = 0.0
+        self.sum_abs_error = 0.0
+        self.sum_sq_error = 0.0
+
+    def features(self, policy):
+        """
+        Constant, linear and quadratic terms of a policy, a tuple of levels
+        (s, S) or (s_a, S_a, s_b, S_b) for two inventories.
+        """
+        x = np.array(policy, dtype = float) / self.scale
+        quad = np.outer(x, x)[np.triu_indices(len(x))]
+
+        return np.concatenate(([1.0], x, quad))
+
+    def ready(self):
+        """
+        Is the model fitted on enough policies to screen proposals?
+        """
+        if self.coef is None:
+            return False
+        return self.samples >= (self.min_samples or 2*len(self.coef))
+
+    def predict(self, policy):
+        """
+        Predicted sample mean cost of a policy.
+        """
+        return np.dot(self.features(policy), self.coef)
+
+    def rmse(self):
+        """
+        Root mean squared error of the predictions, zero if none checked.
+        """
+        if self.errors == 0:
+            return 0.0
+        return sqrt(self.sum_sq_error / self.errors)
+
+    def promising(self, policy, mean, temperature):
+        """
+        Should a proposed policy be simulated? Proposals are screened only
+        once the model is ready, and those screened out are counted.
+
+        Input: proposed policy, sample mean of the current policy, temperature.
+        Output: boolean.
+        """
+        if not self.ready():
+            return True
+        gap = self.predict(policy) - self.rmse() - mean
+        if gap <= 0 or exp(-gap / temperature) >= self.threshold:
+            return True
+        self.screened += 1
+
+        return False
+
+    def update(self, policy, mean):
+        """
+        Add a simulated policy with its sample mean cost to the fit, after
+        recording the error the model made on it.
+        """
+        x = self.features(policy)
+        if self.coef is not None and self.samples > 0:
+            error = np.dot(x, self.coef) - mean
+            self.errors += 1
+            self.sum_error += error
+            self.sum_abs_error += abs(error)
+            self.sum_sq_error += error**2
+        if self.xtx is None:
+            self.xtx = np.zeros((len(x), len(x)))
+            self.xty = np.zeros(len(x))
+        self.xtx += np.outer(x, x)
+        self.xty += x*mean
+        self.samples += 1
+        ## least squares solution, also while the system is underdetermined
+        self.coef = np.linalg.lstsq(self.xtx, self.xty, rcond = None)[0]
+
+    def __str__(self):
+        """
+        Report of the surrogate as string.
+        """
+        info = '\nSimulated policies......... ' + str(self.samples) + '\n'
+        info += 'Screened proposals......... ' + str(self.screened) + '\n'
+        if self.errors > 0:
+            info += 'Mean prediction error...... ' + str(self.sum_error / self.errors) + '\n'
+            info += 'Mean absolute error........ ' + str(self.sum_abs_error / self.errors) + '\n'
+            info += 'Root mean squared error.... ' + str(self.rmse()) + '\n'
+
+        return info